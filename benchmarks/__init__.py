@@ -0,0 +1,5 @@
+"""
+Benchmarks for the hot paths of chomper
+
+Run with "python -m benchmarks", see "python -m benchmarks --help" for the options.
+"""
@@ -0,0 +1,129 @@
+from __future__ import print_function
+
+import os
+import sys
+import gc
+import json
+import argparse
+from timeit import default_timer as timer
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2, peak memory is not measured
+    tracemalloc = None
+
+from benchmarks.cases import BENCHMARKS, TemporaryDirectory
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def measure(run, size, repeat):
+    """
+    Time the best of "repeat" runs, then measure peak memory during one more (slower) traced run
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = timer()
+        run()
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak_memory = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return dict(items_per_sec=size / best if best else None, peak_memory=peak_memory)
+
+
+def compare(name, result, baseline, tolerance):
+    """
+    Get a list of regressions compared with the baseline result
+    """
+    regressions = []
+    if baseline.get('items_per_sec') and result['items_per_sec'] is not None:
+        if result['items_per_sec'] < baseline['items_per_sec'] * (1 - tolerance):
+            regressions.append('%s: %.0f items/sec, baseline %.0f' %
+                               (name, result['items_per_sec'], baseline['items_per_sec']))
+    if baseline.get('peak_memory') and result['peak_memory'] is not None:
+        if result['peak_memory'] > baseline['peak_memory'] * (1 + tolerance):
+            regressions.append('%s: %.1f KiB peak memory, baseline %.1f KiB' %
+                               (name, result['peak_memory'] / 1024.0, baseline['peak_memory'] / 1024.0))
+    return regressions
+
+
+def format_change(value, baseline_value):
+    if not value or not baseline_value:
+        return ''
+    return '%+.1f%%' % ((float(value) / baseline_value - 1) * 100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Run the chomper benchmarks.')
+    parser.add_argument('names', nargs='*', help='Only run benchmarks whose name starts with one of these '
+                                                 '(e.g. "processors" or "importer.csv_feeder")')
+    parser.add_argument('--size', type=int, default=10000, help='Number of items in each dataset')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, the best is reported')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results file')
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed change from the baseline before a result is a regression')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('size') != args.size:
+            print('Baseline was recorded with %s items, results are not comparable' % baseline.get('size'))
+            baseline = {}
+
+    results = {}
+    regressions = []
+
+    print('%-32s %14s %8s %14s %8s' % ('benchmark', 'items/sec', '', 'peak KiB', ''))
+
+    with TemporaryDirectory() as tmp_dir:
+        for name, setup in BENCHMARKS.items():
+            if args.names and not any(name.startswith(prefix) for prefix in args.names):
+                continue
+
+            run = setup(args.size, tmp_dir)
+            if run is None:
+                print('%-32s skipped (missing dependencies)' % name)
+                continue
+
+            result = results[name] = measure(run, args.size, args.repeat)
+            expected = baseline.get('results', {}).get(name, {})
+            regressions += compare(name, result, expected, args.tolerance)
+
+            peak_memory = result['peak_memory']
+            print('%-32s %14.0f %8s %14s %8s' % (
+                name,
+                result['items_per_sec'] or 0,
+                format_change(result['items_per_sec'], expected.get('items_per_sec')),
+                '%.1f' % (peak_memory / 1024.0) if peak_memory is not None else '-',
+                format_change(peak_memory, expected.get('peak_memory'))))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(size=args.size, results=results), f, indent=2, sort_keys=True)
+        print('Saved baseline to %s' % args.baseline)
+
+    if regressions:
+        print('\nRegressions (tolerance %d%%):' % (args.tolerance * 100))
+        for regression in regressions:
+            print('  %s' % regression)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import os
+import csv
+import json
+import shutil
+import tempfile
+import logging
+from collections import OrderedDict
+
+from chomper import Importer, Item
+from chomper.exceptions import DropItem, NotConfigured
+from chomper.feeders import ListFeeder, CsvFeeder, JsonLinesFeeder
+from chomper.processors import Defaulter, Assigner, Dropper, Filter, Mapper, Picker, Omitter, Logger
+from chomper.utils import path_split, path_get, path_set, path_del, path_exists
+
+
+COLUMNS = ['id', 'name', 'status', 'score', 'city']
+STATUSES = ['active', 'inactive', 'pending']
+CITIES = ['Brisbane', 'Sydney', 'Melbourne', 'Perth']
+
+# Registered benchmarks by name, see the benchmark decorator
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(group, name=None):
+    """
+    Register a benchmark
+
+    The decorated function is given the number of items and a temporary directory. It should do
+    any setup and return a function that processes all of the items when called, or None if the
+    benchmark can not be run (e.g. an optional dependency is missing).
+    """
+    def _register(setup):
+        BENCHMARKS['%s.%s' % (group, name or setup.__name__)] = setup
+        return setup
+    return _register
+
+
+def make_records(size):
+    return [dict(id=i, name='Name %d' % i, status=STATUSES[i % 3], score=i % 100, city=CITIES[i % 4])
+            for i in range(size)]
+
+
+def make_items(records):
+    return [Item(record) for record in records]
+
+
+class Counter(object):
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, item):
+        self.count += 1
+        return item
+
+
+def run_importer(pipeline, batch_size=1):
+    class BenchmarkImporter(Importer):
+        pass
+
+    BenchmarkImporter.pipeline = pipeline
+    BenchmarkImporter.batch_size = batch_size
+
+    def run():
+        BenchmarkImporter().run()
+    return run
+
+
+def run_processor(processor, size):
+    records = make_records(size)
+
+    def run():
+        for item in make_items(records):
+            try:
+                processor(item)
+            except DropItem:
+                pass
+    return run
+
+
+# Importers and feeders
+
+@benchmark('importer')
+def list_feeder(size, tmp_dir):
+    return run_importer([ListFeeder(make_records(size)), Counter()])
+
+
+@benchmark('importer')
+def list_feeder_batched(size, tmp_dir):
+    return run_importer([ListFeeder(make_records(size)), Item.score.filter(lambda value: value + 1), Counter()],
+                        batch_size=100)
+
+
+@benchmark('importer')
+def list_feeder_branches(size, tmp_dir):
+    return run_importer([ListFeeder(make_records(size)), [Item.status.set('branch'), Counter()], Counter()])
+
+
+@benchmark('importer')
+def csv_feeder(size, tmp_dir):
+    path = os.path.join(tmp_dir, 'data.csv')
+    with open(path, 'w') as f:
+        writer = csv.writer(f)
+        for record in make_records(size):
+            writer.writerow([record[column] for column in COLUMNS])
+    return run_importer([CsvFeeder(path, COLUMNS), Counter()])
+
+
+@benchmark('importer')
+def jsonlines_feeder(size, tmp_dir):
+    path = os.path.join(tmp_dir, 'data.jsonlines')
+    with open(path, 'w') as f:
+        for record in make_records(size):
+            f.write(json.dumps(record) + '\n')
+    return run_importer([JsonLinesFeeder(path), Counter()])
+
+
+# Processors
+
+@benchmark('processors')
+def defaulter(size, tmp_dir):
+    return run_processor(Defaulter(Item, dict(country='Australia', status='unknown')), size)
+
+
+@benchmark('processors')
+def assigner(size, tmp_dir):
+    return run_processor(Assigner(Item.country, 'Australia'), size)
+
+
+@benchmark('processors')
+def dropper(size, tmp_dir):
+    return run_processor(Dropper(Item, Item.status == 'inactive'), size)
+
+
+@benchmark('processors', 'filter')
+def filter_(size, tmp_dir):
+    return run_processor(Filter(Item.name, lambda value: value.upper()), size)
+
+
+@benchmark('processors')
+def mapper(size, tmp_dir):
+    return run_processor(Mapper(Item.status, dict(active='A', inactive='I', pending='P')), size)
+
+
+@benchmark('processors')
+def picker(size, tmp_dir):
+    return run_processor(Picker(Item, [Item.id, Item.name]), size)
+
+
+@benchmark('processors')
+def omitter(size, tmp_dir):
+    return run_processor(Omitter(Item, [Item.score, Item.city]), size)
+
+
+@benchmark('processors')
+def logger(size, tmp_dir):
+    # Items are serialised even when the level is disabled, which is what this measures
+    logging.getLogger(Logger.__name__).setLevel(logging.CRITICAL)
+    return run_processor(Logger(Item), size)
+
+
+# Path utils
+
+def run_paths(func, size):
+    obj = dict(users=[dict(name='Jeff', address=dict(city='Brisbane'))])
+    paths = ['users[0].address.city', 'users[0].name', 'users[1].name', 'missing']
+
+    def run():
+        for i in range(size):
+            func(paths[i % 4], obj)
+    return run
+
+
+@benchmark('utils', 'path_split')
+def path_split_(size, tmp_dir):
+    paths = ['users[0].address.city', 'users[0].name', 'name', 'missing.key']
+
+    def run():
+        for i in range(size):
+            path_split(paths[i % 4])
+    return run
+
+
+@benchmark('utils', 'path_get')
+def path_get_(size, tmp_dir):
+    return run_paths(path_get, size)
+
+
+@benchmark('utils', 'path_set')
+def path_set_(size, tmp_dir):
+    return run_paths(lambda path, obj: path_set(path, obj, 'value'), size)
+
+
+@benchmark('utils', 'path_del')
+def path_del_(size, tmp_dir):
+    def delete(path, obj):
+        path_del(path, obj)
+        path_set(path, obj, 'value')
+    return run_paths(delete, size)
+
+
+@benchmark('utils', 'path_exists')
+def path_exists_(size, tmp_dir):
+    return run_paths(path_exists, size)
+
+
+# SQL exporters (SQLite)
+
+def run_sql_exporter(exporter_name, size, tmp_dir, batch_size=1, seed=False, **kwargs):
+    try:
+        from chomper.contrib import sql
+        from chomper.contrib.sql.database import manager
+    except NotConfigured:
+        return None
+
+    path = os.path.join(tmp_dir, '%s-%d.db' % (exporter_name, batch_size))
+    database = dict(driver='sqlite', host='', database=path, user='')
+    exporter = getattr(sql, exporter_name)('benchmark', **kwargs).database(database)
+    connection = manager.connection(exporter._connection_name)
+    records = make_records(size)
+
+    # Inserted rows pile up when the benchmark is repeated, so there is no unique key on id
+    connection.statement('CREATE TABLE benchmark (id INTEGER, name TEXT, status TEXT, score INTEGER, city TEXT)')
+    if seed:
+        connection.statement('CREATE INDEX benchmark_id ON benchmark (id)')
+        connection.table('benchmark').insert(records)
+
+    return run_importer([ListFeeder(records), exporter], batch_size=batch_size)
+
+
+@benchmark('sql')
+def inserter(size, tmp_dir):
+    return run_sql_exporter('Inserter', size, tmp_dir)
+
+
+@benchmark('sql')
+def inserter_batched(size, tmp_dir):
+    return run_sql_exporter('Inserter', size, tmp_dir, batch_size=100)
+
+
+@benchmark('sql')
+def updater(size, tmp_dir):
+    return run_sql_exporter('Updater', size, tmp_dir, seed=True, identifiers=['id'])
+
+
+@benchmark('sql')
+def upserter(size, tmp_dir):
+    return run_sql_exporter('Upserter', size, tmp_dir, seed=True, identifiers=['id'])
+
+
+class TemporaryDirectory(object):
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp(prefix='chomper-benchmark-')
+        return self.path
+
+    def __exit__(self, *args):
+        shutil.rmtree(self.path, ignore_errors=True)
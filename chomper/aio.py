@@ -0,0 +1,193 @@
+"""
+Asyncio execution of importer pipelines (requires Python 3.6+)
+
+Actions may return awaitables (e.g. an exporter with an "async def export" method) or async
+generators (e.g. a feeder with an "async def feed" method that yields items) as well as any of
+the results supported by Importer.run.
+"""
+import asyncio
+import inspect
+from timeit import default_timer as timer
+
+from chomper.exceptions import DropItem, ItemNotImportable
+from chomper.items import Item, fork
+from chomper.plan import ACTION, BRANCH, DONE, CONCURRENT
+
+
+class AsyncExecutor(object):
+    """
+    Runs an importer's execution plan on an asyncio event loop
+
+    Every item created by a feeder is run through the rest of the pipeline as its own task. At most
+    "concurrency" tasks are running at once, so feeders are only read while there is room for more
+    items. Tasks give up their slot before the items they create are started.
+    """
+
+    def __init__(self, importer, concurrency=None):
+        self.importer = importer
+        self.concurrency = concurrency if concurrency else importer.concurrency
+        self.steps = importer.plan.steps
+        self.siblings = importer.plan.siblings if importer.branch_threads else {}
+        self.tasks = set()
+        self.error = None
+        self._semaphore = None
+
+    async def run(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        await self._spawn_all(await self._execute(Item(), 0))
+
+        while self.tasks:
+            await asyncio.wait(list(self.tasks))
+
+        if self.error is not None:
+            raise self.error
+
+    async def _execute(self, item, index):
+        """
+        Run an item through the plan until it reaches the end of the pipeline or an action creates
+        multiple items. Returns a list of (items, step index) the created items should start from.
+        """
+        importer = self.importer
+        spawn = []
+
+        while True:
+            op, action, next_index, _, stats, invoke = self.steps[index]
+            if op == ACTION:
+                result = await self._invoke_action(action, item, stats, invoke)
+                if not result:
+                    break
+                elif isinstance(result, (list, tuple)) or inspect.isgenerator(result) or inspect.isasyncgen(result):
+                    spawn.append((result, next_index))
+                    break
+                item = result
+            elif op == BRANCH:
+                if index in self.siblings:
+                    # Sibling branches run at the same time, the item continues once they finish
+                    starts, next_index = self.siblings[index]
+                    for branch_spawn in await asyncio.gather(*[self._execute(fork(item), start) for start in starts]):
+                        spawn += branch_spawn
+                else:
+                    spawn += await self._execute(fork(item), action)
+            elif op == CONCURRENT:
+                future = action.submit(importer._run_item, [item], importer.plan.concurrent[index])
+                outputs, _ = await asyncio.wrap_future(future)
+                spawn.append((outputs, next_index))
+                break
+            else:
+                if op == DONE:
+                    importer.items_processed += 1
+                    importer._item_exported(item)
+                break
+            index = next_index
+
+        return spawn
+
+    async def _invoke_action(self, action, item, stats, invoke):
+        importer = self.importer
+
+        if not callable(action):
+            return importer._invoke_action(action, [item, importer])
+
+        start = timer()
+        try:
+            result = invoke([item, importer])
+            if inspect.isawaitable(result):
+                result = await result
+        except DropItem:
+            importer._count_dropped()
+            if stats is not None:
+                stats.record(timer() - start, dropped=1)
+            return None
+        except ItemNotImportable as e:
+            importer.logger.error(str(e))
+            importer._count_dropped()
+            if stats is not None:
+                stats.record(timer() - start, dropped=1, exceptions=1)
+            return None
+        except Exception:
+            if stats is not None:
+                stats.record(timer() - start, exceptions=1)
+            raise
+
+        if stats is not None:
+            if inspect.isasyncgen(result):
+                return _iter_timed(stats, result, timer() - start)
+            return importer._record_result(stats, result, start)
+        return result
+
+    async def _spawn_all(self, spawn):
+        for results, index in spawn:
+            if inspect.isasyncgen(results):
+                async for item in results:
+                    if not await self._spawn(item, index):
+                        return
+            else:
+                for item in results:
+                    if not await self._spawn(item, index):
+                        return
+
+    async def _spawn(self, item, index):
+        if item is None:
+            return True
+
+        await self._semaphore.acquire()
+
+        if self.error is not None:
+            self._semaphore.release()
+            return False
+
+        task = asyncio.ensure_future(self._run_task(item, index))
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return True
+
+    async def _run_task(self, item, index):
+        try:
+            spawn = await self._execute(item, index)
+        finally:
+            self._semaphore.release()
+        await self._spawn_all(spawn)
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None and self.error is None:
+            self.error = task.exception()
+
+
+async def _iter_timed(stats, results, duration):
+    """
+    Wrap the async generator returned by an action, so the time spent creating each item is counted
+    (see ActionStats.iter_timed)
+    """
+    stats.record(duration)
+    while True:
+        start = timer()
+        try:
+            result = await results.__anext__()
+        except StopAsyncIteration:
+            stats.record_generated(timer() - start)
+            return
+        except Exception:
+            stats.record_generated(timer() - start, exceptions=1)
+            raise
+        stats.record_generated(timer() - start, items_out=1)
+        yield result
+
+
+async def arun(importer):
+    loop = asyncio.get_event_loop()
+    delay = importer.idle_delay
+    try:
+        while True:
+            handled = importer.items_processed + importer.items_dropped
+            inputs = importer._fingerprint_inputs()
+            if not importer._inputs_unchanged(inputs):
+                await AsyncExecutor(importer).run()
+                importer._items_exported()
+                importer._save_inputs(inputs)
+            if importer.close_when_idle:
+                break
+            # Feeders may block while they wait for data, so wait on a thread
+            delay = await loop.run_in_executor(None, importer._wait_between_runs, delay, handled)
+    finally:
+        importer.close()
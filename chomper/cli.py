@@ -0,0 +1,144 @@
+"""
+Command line runner for importers
+
+Usage: chomper [options] module:ImporterClass
+"""
+from __future__ import print_function
+
+import os
+import sys
+import json
+import logging
+import argparse
+import importlib
+from timeit import default_timer as timer
+
+from chomper.importers import Importer
+
+
+def load_importer(path):
+    """
+    Load an importer class from a "module:Class" path
+    """
+    module_name, _, class_name = path.partition(':')
+    if not module_name or not class_name:
+        raise ValueError('Importer must be given as "module:Class", got "%s"' % path)
+
+    module = importlib.import_module(module_name)
+    try:
+        importer_cls = getattr(module, class_name)
+    except AttributeError:
+        raise ValueError('Module "%s" has no importer named "%s"' % (module_name, class_name))
+
+    if not isinstance(importer_cls, type) or not issubclass(importer_cls, Importer):
+        raise ValueError('"%s" is not an Importer subclass' % path)
+
+    return importer_cls
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='chomper', description='Run a chomper importer.')
+    parser.add_argument('importer', help='Importer class to run, as "module:Class"')
+    parser.add_argument('-w', '--workers', type=int, help='Number of worker processes')
+    parser.add_argument('-b', '--batch-size', type=int, help='Number of items given to batch actions at once')
+    parser.add_argument('--chunk-size', type=int, help='Number of items sent to a worker process at once')
+    parser.add_argument('--memory-budget', type=int, help='Bytes of waiting items to keep in memory before '
+                                                          'spilling to disk')
+
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--long-running', dest='close_when_idle', action='store_false', default=None,
+                      help='Keep running and wait for the feeders to have more data')
+    mode.add_argument('--once', dest='close_when_idle', action='store_true',
+                      help='Run the pipeline once and exit (even if the importer is long running)')
+
+    parser.add_argument('--asyncio', action='store_true', help='Run the importer on an asyncio event loop')
+    parser.add_argument('--profile', metavar='FILE', help='Profile the run and save the stats to FILE '
+                                                          '(only the main process is profiled)')
+    parser.add_argument('--stats', metavar='FILE', help='Write the importer stats as JSON to FILE when it exits '
+                                                        '("-" for stdout)')
+    parser.add_argument('--log-level', default='INFO', help='Logging level (default: INFO)')
+    return parser
+
+
+def get_options(args):
+    """
+    Get the importer attributes set by the command line arguments
+    """
+    options = dict(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        memory_budget=args.memory_budget,
+        close_when_idle=args.close_when_idle
+    )
+    return dict((key, value) for key, value in options.items() if value is not None)
+
+
+def run(importer, use_asyncio=False):
+    if use_asyncio:
+        import asyncio
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(importer.arun())
+        finally:
+            loop.close()
+    else:
+        importer.run()
+
+
+def write_stats(importer, path, duration):
+    stats = importer.stats()
+    stats['duration'] = duration
+    stats['items_per_sec'] = importer.items_processed / duration if duration else None
+
+    if path == '-':
+        json.dump(stats, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        with open(path, 'w') as f:
+            json.dump(stats, f, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO))
+
+    # Importers are usually defined in the project the command is run from
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    try:
+        importer_cls = load_importer(args.importer)
+    except (ImportError, ValueError) as e:
+        parser.error(str(e))
+
+    importer = importer_cls(**get_options(args))
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = timer()
+    try:
+        run(importer, args.asyncio)
+    except KeyboardInterrupt:
+        # Importer.run closes the actions on the way out
+        importer.logger.info('Interrupted, stopping importer')
+        return 130
+    finally:
+        duration = timer() - start
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.stats:
+            write_stats(importer, args.stats, duration)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
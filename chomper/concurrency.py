@@ -0,0 +1,331 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer as timer
+
+import six
+from six.moves.queue import Queue, Empty, Full
+
+from chomper.support.spill import SpillBuffer
+
+
+class AdaptiveLimit(object):
+    """
+    Limit on the number of calls in flight that adapts to latency and errors (AIMD)
+
+    The limit grows by one for every "limit" calls that finish without an error and with a
+    smoothed latency within "tolerance" times the baseline latency (the lowest latency seen
+    recently). It is multiplied by "backoff" when a call fails or latency goes over that, at most
+    once for each round of calls that were already in flight. The limit stays between "min_limit"
+    and "max_limit".
+
+    The baseline creeps up by "drift" for each call that does not beat it, so a service that
+    stays slower for good becomes the new baseline instead of keeping the limit at its minimum.
+    """
+
+    def __init__(self, min_limit=1, max_limit=64, initial=None, backoff=0.5, tolerance=2.0, smoothing=0.2,
+                 drift=0.01):
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError('Limits must be at least 1, with min_limit <= max_limit')
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.drift = drift
+        self.latency = None
+        self.baseline = None
+        self.increases = 0
+        self.decreases = 0
+        self._limit = float(min(max(initial if initial is not None else min_limit, min_limit), max_limit))
+        self._cooldown = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def record(self, duration, error=False):
+        with self._lock:
+            if self.latency is None:
+                self.latency = self.baseline = duration
+            else:
+                self.latency += self.smoothing * (duration - self.latency)
+                self.baseline = min(duration, self.baseline * (1 + self.drift))
+
+            if self._cooldown:
+                self._cooldown -= 1
+
+            if error or self.latency > self.baseline * self.tolerance:
+                if not self._cooldown:
+                    # Calls still in flight were started at the old limit, let them finish before backing off again
+                    self._cooldown = self.limit
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self.decreases += 1
+            elif self._limit < self.max_limit:
+                previous = self.limit
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+                if self.limit > previous:
+                    self.increases += 1
+
+    def as_dict(self):
+        return dict(
+            limit=self.limit,
+            min_limit=self.min_limit,
+            max_limit=self.max_limit,
+            latency=self.latency,
+            baseline=self.baseline,
+            increases=self.increases,
+            decreases=self.decreases
+        )
+
+
+class IoBound(object):
+    """
+    Run an action (or a list of actions) on a pool of threads
+
+    Useful for actions that spend most of their time waiting on the network, such as database
+    exporters or http requests. Up to "in_flight" items are handed to the pool before the importer
+    waits for results, which also stops more items from being read from the feeder.
+
+    Set "adaptive" to tune the number of items in flight from the latency and errors of the
+    wrapped actions instead (see AdaptiveLimit). Items rejected by the wrapped actions (with
+    ItemNotImportable) count as errors. True limits it to between 1 and "threads".
+
+    :param actions: An action or a list of actions (a sub-pipeline) to run on the pool
+    :param threads: Number of threads in the pool
+    :param in_flight: Max number of items (or batches) submitted at once, defaults to twice the threads
+    :param adaptive: True or an AdaptiveLimit to adapt the number of items in flight
+    """
+
+    def __init__(self, actions, threads=4, in_flight=None, adaptive=None):
+        if not isinstance(actions, list):
+            actions = [actions]
+
+        if adaptive is True:
+            adaptive = AdaptiveLimit(max_limit=threads)
+
+        self.actions = actions
+        self.threads = threads
+        self.adaptive = adaptive or None
+        self._in_flight = in_flight if in_flight else threads * 2
+        self._executor = None
+
+    def __repr__(self):
+        return 'IoBound(%s)' % self.actions
+
+    @property
+    def in_flight(self):
+        if self.adaptive is not None:
+            return self.adaptive.limit
+        return self._in_flight
+
+    def submit(self, func, *args):
+        """
+        Run a function on the pool, it should return a tuple of its results and whether it failed
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.threads)
+        if self.adaptive is not None:
+            return self._executor.submit(self._run_timed, func, args)
+        return self._executor.submit(func, *args)
+
+    def _run_timed(self, func, args):
+        start = timer()
+        try:
+            result = func(*args)
+        except Exception:
+            self.adaptive.record(timer() - start, error=True)
+            raise
+        # Rejected items are dropped without stopping the run, but still count as errors
+        self.adaptive.record(timer() - start, error=result[1])
+        return result
+
+    def open(self):
+        # Threads are not copied into forked worker processes, so a new pool is started on next use
+        self._executor = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class Stage(object):
+    """
+    Mark the start of a pipeline stage that runs on its own thread
+
+    Items reaching the marker are put on a queue of at most "size" items, and the actions after
+    it take them from the queue on another thread. This lets stages overlap, e.g. the feeder
+    keeps reading while an exporter waits on the database, and a full queue makes the stages
+    before it wait instead of buffering the whole input.
+
+    Stages only apply to the top level pipeline when Importer.run is used without worker
+    processes, elsewhere the marker passes items straight through.
+
+    :param size: Max number of items waiting in the queue
+    :param name: Name used in the stats, defaults to "stage" and the stage number
+    """
+
+    def __init__(self, size=1000, name=None):
+        self.size = size
+        self.name = name
+
+    def __repr__(self):
+        return 'Stage(%s)' % self.size
+
+    def __call__(self, item):
+        return item
+
+
+class Spool(Stage):
+    """
+    Mark the start of a pipeline stage that is fed through a durable spool on disk
+
+    Items reaching the marker are written to a SQLite database at "path" without waiting on the
+    stages after it, so the feeder keeps reading at full speed while an exporter is slow or down.
+    The stage after the spool drains it in batches of "batch_size" items. A batch that raises an
+    exception is retried up to "max_retries" times, waiting "retry_delay" seconds (doubling each
+    time) before each retry. Items are only removed from the spool once their batch has run, so
+    a restarted importer drains whatever an earlier run left behind. See SpoolQueue.
+
+    :param path: Path of the SQLite database file
+    :param batch_size: Number of items drained at once
+    :param name: Name used in the stats, defaults to "stage" and the stage number
+    :param max_retries: Retries for a failing batch before the exception is raised
+    :param retry_delay: Seconds to wait before the first retry
+    """
+
+    def __init__(self, path, batch_size=500, name=None, max_retries=5, retry_delay=1.0):
+        super(Spool, self).__init__(batch_size, name)
+        self.path = path
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def __repr__(self):
+        return 'Spool(%r)' % self.path
+
+
+class StageQueue(object):
+    """
+    Bounded queue between two pipeline stages, counting how long the stages wait on each other
+
+    Each importer has its own queue for every Stage in its pipeline. With a memory "budget" (in
+    bytes) the queue never makes the stage before it wait. Items that do not fit in the queue
+    are spilled to disk instead (see SpillBuffer).
+    """
+
+    # Seconds between checks for a closed queue while waiting on it
+    poll_interval = 0.1
+
+    def __init__(self, size, name, budget=None, directory=None):
+        self.size = size
+        self.name = name
+        self.items = 0
+        self.max_depth = 0
+        self.put_stall = 0.0
+        self.get_stall = 0.0
+        self._queue = None
+        self._buffer = SpillBuffer(budget, size, directory) if budget is not None else None
+        self._ready = threading.Condition()
+        self._closed = threading.Event()
+        self._error = None
+
+    def stats(self):
+        """
+        Get the queue depth and the time (in seconds) the stages spent waiting on each other
+
+        "put_stall" is the time the stage before spent waiting for room in the queue (the stage
+        after it was too slow), "get_stall" is the time the stage after spent waiting for items.
+        """
+        return dict(
+            name=self.name,
+            size=self.size,
+            depth=self._depth(),
+            max_depth=self.max_depth,
+            items=self.items,
+            put_stall=self.put_stall,
+            get_stall=self.get_stall,
+            spilled_items=self._buffer.spilled_items if self._buffer is not None else 0,
+            spilled_bytes=self._buffer.spilled_bytes if self._buffer is not None else 0
+        )
+
+    def open(self):
+        if self._buffer is not None:
+            self._buffer.clear()
+        else:
+            self._queue = Queue(self.size)
+        self._closed.clear()
+        self._error = None
+
+    def close(self):
+        # Stops both stages from waiting on a queue that is no longer used
+        self._closed.set()
+        if self._buffer is not None:
+            self._buffer.close()
+
+    def feed(self, items):
+        """
+        Put items on the queue followed by None, keeping the exception if one stops the items
+        """
+        try:
+            for item in items:
+                if not self._put(item):
+                    return
+        except BaseException:
+            self._error = sys.exc_info()
+        self._put(None)
+
+    def __iter__(self):
+        while True:
+            start = timer()
+            try:
+                item = self._get()
+            except Empty:
+                self.get_stall += timer() - start
+                if self._closed.is_set():
+                    return
+                continue
+            self.get_stall += timer() - start
+            if item is None:
+                if self._error is not None:
+                    six.reraise(*self._error)
+                return
+            self.items += 1
+            yield item
+
+    def _depth(self):
+        if self._buffer is not None:
+            return len(self._buffer)
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _get(self):
+        if self._buffer is None:
+            return self._queue.get(timeout=self.poll_interval)
+
+        with self._ready:
+            if not len(self._buffer):
+                self._ready.wait(self.poll_interval)
+            try:
+                return self._buffer.popleft()
+            except IndexError:
+                raise Empty()
+
+    def _put(self, item):
+        start = timer()
+        while not self._closed.is_set():
+            if self._buffer is not None:
+                self._buffer.append(item)
+                with self._ready:
+                    self._ready.notify()
+            else:
+                try:
+                    self._queue.put(item, timeout=self.poll_interval)
+                except Full:
+                    continue
+            self.put_stall += timer() - start
+            self.max_depth = max(self.max_depth, self._depth())
+            return True
+        return False
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import six
+from collections import OrderedDict
 
 from chomper import config
 from chomper.exceptions import NotConfigured, ItemNotImportable
@@ -49,9 +50,19 @@ class PostgresProcessor(Exporter):
             port=self.port
         )
 
+        self.connection = None
+        self.open()
+        self.check_postgres_version()
+
+    def open(self):
+        """
+        Open a new database connection
+
+        Importers call this in each of their worker processes. The previous connection is
+        left open as it belongs to the parent process.
+        """
         self.connection = psycopg2.connect(**self.connection_args)
         self.connection.set_client_encoding('utf-8')
-        self.check_postgres_version()
 
     def check_postgres_version(self):
         """
@@ -160,6 +171,31 @@ class PostgresInserter(PostgresProcessor):
         finally:
             cursor.close()
 
+    def export_batch(self, items):
+        """
+        Insert a list of items using one query per distinct set of columns and a single commit
+
+        When the insert fails the whole batch is rolled back and rejected, the importer then inserts
+        the items one at a time.
+        """
+        queries = OrderedDict()
+        for item in items:
+            sql = self.insert_sql_template(item)
+            queries.setdefault(sql, []).append(self.insert_sql_params(item))
+
+        cursor = self.connection.cursor()
+        try:
+            for sql, params in six.iteritems(queries):
+                cursor.executemany(sql, params)
+            self.connection.commit()
+        except ProgrammingError as e:
+            self.connection.rollback()
+            self.handle_error(e)
+        else:
+            return items
+        finally:
+            cursor.close()
+
     def insert_sql_template(self, item):
         """
         Build a template for the SQL insert query. Don't interpolate the values
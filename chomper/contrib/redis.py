@@ -1,10 +1,21 @@
 from __future__ import absolute_import
 
 import six
+import math
+import uuid
+import socket
+import logging
+import threading
+import traceback
+from collections import deque
+from six.moves import cPickle as pickle
 
 from chomper import config
-from chomper.exceptions import NotConfigured
+from chomper.exceptions import NotConfigured, WorkerError
+from chomper.importers import run_chunk
+from chomper.items import Item
 from chomper.readers import Reader
+from chomper.utils import chunked
 
 try:
     import redis
@@ -12,6 +23,28 @@ except ImportError:
     raise NotConfigured('Redis library not installed')
 
 
+# Connection pools shared by every reader in the process, by connection arguments
+_pools = dict()
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(host, port, **kwargs):
+    """
+    Get the shared connection pool for a Redis server, creating it on first use
+    """
+    key = (host, port, repr(sorted(kwargs.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = redis.ConnectionPool(host=host, port=port, **kwargs)
+        return _pools[key]
+
+
+def get_client(host=None, port=None, redis_args=None):
+    host = host if host is not None else config.get('redis', 'host')
+    port = port if port is not None else config.getint('redis', 'port')
+    return redis.StrictRedis(connection_pool=get_connection_pool(host, port, **(redis_args or dict())))
+
+
 class QueueReader(Reader):
     """
     Redis queue reader
@@ -30,10 +63,9 @@ class QueueReader(Reader):
 
         self.keys = keys
         self.timeout = timeout
+        self._buffer = deque()
 
-        host = host if host is not None else config.get('redis', 'host')
-        port = port if port is not None else config.getint('redis', 'port')
-        self.redis = redis.StrictRedis(host=host, port=port, **redis_args)
+        self.redis = get_client(host, port, redis_args)
         self.logger.info('Reading from Redis keys %s' % ', '.join(self.keys))
 
     def read(self):
@@ -45,8 +77,23 @@ class QueueReader(Reader):
             else:
                 yield data
 
+    def wait(self, timeout):
+        """
+        Block on the queue until an item is pushed, the item is kept for the next read
+        """
+        if self._buffer:
+            return True
+        result = self.redis.blpop(self.keys, max(int(math.ceil(timeout)), 1))
+        if result is None:
+            return False
+        source, data = result
+        self._buffer.append(data)
+        return True
+
     def _pop(self):
-        if self.timeout is not None:
+        if self._buffer:
+            return self._buffer.popleft()
+        elif self.timeout is not None:
             result = self.redis.blpop(self.keys, self.timeout)
             if result is not None:
                 source, data = result
@@ -59,3 +106,136 @@ class QueueReader(Reader):
                 if result is not None:
                     return result
             return None
+
+
+class Coordinator(object):
+    """
+    Split one import across machines, sending chunks of items to Redis workers
+
+    The importer's pipeline up to (and including) the first feeder runs here, as it does for
+    worker processes. Its items are pushed in chunks of "chunk_size" as tasks on a Redis list,
+    and Workers on any machine run them through the rest of the pipeline. Each worker pushes its
+    counters and action stats back, which are added to the importer's. At most "max_pending"
+    tasks are queued or running at once, so the feeder is only read as fast as the workers keep
+    up. A WorkerError is raised if a task fails, or if no result arrives for "result_timeout"
+    seconds (e.g. because no workers are running). With a "result_timeout" of None the
+    coordinator waits for results indefinitely.
+
+    The coordinator and workers must be given the same importer class, and the same key. Tasks
+    and results are pickled, and unpickling data can run arbitrary code, so only use a Redis
+    server that nothing untrusted can write to.
+    """
+
+    # Seconds that result lists are kept for a coordinator that has gone away
+    result_ttl = 24 * 60 * 60
+
+    def __init__(self, importer, key=None, chunk_size=None, max_pending=100, result_timeout=300,
+                 host=None, port=None, redis_args=None):
+        self.importer = importer
+        self.key = key or 'chomper:%s' % importer.name
+        self.chunk_size = chunk_size or importer.chunk_size
+        self.max_pending = max_pending
+        self.result_timeout = result_timeout
+        self.redis = get_client(host, port, redis_args)
+        self.tasks_sent = 0
+
+    @property
+    def logger(self):
+        return logging.getLogger(__name__)
+
+    def run(self):
+        importer = self.importer
+        split = importer._split_index()
+        items = importer._iter_items([Item()], plan=importer.plan.until(split + 1))
+        results_key = '%s:results:%s' % (self.key, uuid.uuid4().hex)
+        pending = 0
+
+        try:
+            for chunk in chunked(items, self.chunk_size):
+                task = (results_key, self.tasks_sent, split + 1, chunk)
+                self.redis.rpush(self.key, pickle.dumps(task, pickle.HIGHEST_PROTOCOL))
+                self.tasks_sent += 1
+                pending += 1
+                if pending >= self.max_pending:
+                    self._merge_result(results_key)
+                    pending -= 1
+            while pending:
+                self._merge_result(results_key)
+                pending -= 1
+        finally:
+            self.redis.delete(results_key)
+            importer.close()
+
+    def _merge_result(self, results_key):
+        result = self.redis.blpop(results_key, int(math.ceil(self.result_timeout or 0)))
+        if result is None:
+            # Only possible with a timeout, None waits indefinitely
+            raise WorkerError('No result from workers on "%s" in %s seconds' % (self.key, self.result_timeout))
+
+        worker, number, error, result = pickle.loads(result[1])
+        if error is not None:
+            raise WorkerError('Worker %s failed to run task %d:\n%s' % (worker, number, error))
+        self.importer._merge_worker_result(result)
+
+
+class Worker(object):
+    """
+    Run the tasks sent by a Coordinator through the rest of an importer's pipeline
+
+    Workers can run on any machine that can reach the Redis server, several workers may share a
+    queue. Tasks are run one at a time until "stop" is called, or until no task has arrived for
+    "idle_timeout" seconds if it is set. A failing task is reported to the coordinator and the
+    worker goes on to the next one. Tasks are unpickled, so the Redis server must be trusted
+    (see Coordinator).
+    """
+
+    def __init__(self, importer, key=None, idle_timeout=None, host=None, port=None, redis_args=None):
+        self.importer = importer
+        self.key = key or 'chomper:%s' % importer.name
+        self.idle_timeout = idle_timeout
+        self.redis = get_client(host, port, redis_args)
+        self.name = '%s:%d' % (socket.gethostname(), id(self))
+        self.tasks_run = 0
+        self._stopped = threading.Event()
+
+    @property
+    def logger(self):
+        return logging.getLogger(__name__)
+
+    def run(self):
+        self._stopped.clear()
+        idle = 0.0
+        try:
+            while not self._stopped.is_set():
+                # Short waits so the worker notices when it is stopped
+                task = self.redis.blpop(self.key, 1)
+                if task is not None:
+                    idle = 0.0
+                    self._run_task(task[1])
+                else:
+                    idle += 1
+                    if self.idle_timeout is not None and idle >= self.idle_timeout:
+                        break
+        finally:
+            self.importer.close()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run_task(self, data):
+        results_key, number, start, items = pickle.loads(data)
+        error, result = None, None
+        try:
+            result = run_chunk(self.importer, items, start)
+        except Exception:
+            self.logger.exception('Error running task %d from "%s"' % (number, self.key))
+            error = traceback.format_exc()
+            # Drop the stats of the failed task, so they are not sent with the next one
+            for stats in self.importer.plan.iter_stats():
+                stats.snapshot(reset=True)
+
+        self.tasks_run += 1
+        with self.redis.pipeline() as pipe:
+            pipe.rpush(results_key, pickle.dumps((self.name, number, error, result), pickle.HIGHEST_PROTOCOL))
+            pipe.expire(results_key, Coordinator.result_ttl)
+            pipe.execute()
@@ -103,6 +103,10 @@ class SqlBase(GenerativeBase):
             log_queries=config.getboolean(connection_name, 'log_queries', False)
         )
 
+    def open(self):
+        # Called in importer worker processes, which must not share the parent's connection
+        manager.forget_connection(self._connection_name)
+
     def _get_connection(self):
         return manager.connection(self._connection_name)
 
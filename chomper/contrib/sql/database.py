@@ -18,6 +18,14 @@ class DatabaseManager(BaseDatabaseManager):
         if name not in self._config:
             self._config[name] = connection
 
+    def forget_connection(self, name=None):
+        """
+        Remove a connection from the cache without disconnecting, so a new one is made on next use
+        """
+        if name is None:
+            name = self.get_default_connection()
+        self._connections.pop(name, None)
+
 
 class SQLiteConnection(BaseSQLiteConnection):
 
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from datetime import datetime
 from pytz import timezone
 import six
@@ -177,6 +178,26 @@ class Inserter(SqlExporterBase):
 
         return item
 
+    def export_batch(self, items):
+        """
+        Insert a list of items using one query per distinct set of columns
+
+        Falls back to inserting each item when a custom insert query is used or
+        the inserted ids need to be set on the items.
+        """
+        if self._insert_query or self._set_id_field:
+            return [self.export(item) for item in items]
+
+        rows = OrderedDict()
+        for item in items:
+            data = self._prepare_fields(item, timestamps=self._timestamps, inserting=True)
+            rows.setdefault(tuple(sorted(data.keys())), []).append(data)
+
+        for data in six.itervalues(rows):
+            self._run_query(Query().from_(self._table).insert(data))
+
+        return items
+
     @generative
     def insert(self, query):
         self._insert_query = query
@@ -15,16 +15,35 @@ class SqlFeederBase(SqlBase, Feeder):
 
 
 class TableFeeder(SqlFeederBase):
+    """
+    Feed every row in a table
+
+    Set "key" to a unique column (e.g. the primary key) to feed the rows in key order, so the
+    feeder can resume after the last key that was fed (its "position").
+    """
 
     def __init__(self, table, *args, **kwargs):
         super(TableFeeder, self).__init__(*args, **kwargs)
         self._table = table
         self._chunk_size = kwargs.pop('chunk', 100)
+        self._key = kwargs.pop('key', None)
 
     def feed(self, item):
         results = self._run_query(self._build_query(), item=item)
         for result in self._iter_results(results):
-            yield self._row_to_item(result)
+            item = self._row_to_item(result)
+            if self._key is not None:
+                self.position = item[self._key]
+            yield item
+
+    def seek(self, position):
+        if self._key is None:
+            raise NotImplementedError('TableFeeder can only resume with a key column')
+        self._start = position
+
+    @generative
+    def key(self, column):
+        self._key = column
 
     @generative
     def chunk(self, size):
@@ -34,6 +53,11 @@ class TableFeeder(SqlFeederBase):
 
     def _build_query(self):
         query = Query().from_(self._table)
+        if self._key is not None:
+            if self._start is not None:
+                query.where(self._key, '>', self._start)
+                self._start = None
+            query.order_by(self._key)
         if not self._chunk_size:
             query.get()
         else:
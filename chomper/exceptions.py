@@ -31,3 +31,10 @@ class DropField(Exception):
     Exception used to drop the field from within an action processor
     """
     pass
+
+
+class WorkerError(Exception):
+    """
+    Indicates a worker (possibly on another machine) failed to run a chunk of items
+    """
+    pass
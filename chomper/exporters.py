@@ -16,5 +16,8 @@ class Exporter(object):
     def export(self, item):
         raise NotImplementedError('All exporters must implement the "export" method')
 
+    def open(self):
+        pass
+
     def close(self):
         pass
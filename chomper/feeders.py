@@ -1,13 +1,21 @@
+import sys
+import time
 import logging
+import itertools
+import threading
 import csv
 import pprint
+from concurrent.futures import ThreadPoolExecutor
+
+import six
+from six.moves.queue import Queue, Empty, Full
 
 try:
     import simplejson as json
 except ImportError:
     import json
 
-from chomper import Item
+from chomper.items import Item
 from chomper.exceptions import ItemNotImportable
 from chomper.readers import Reader, FileReader, HttpReader
 
@@ -15,6 +23,10 @@ from chomper.readers import Reader, FileReader, HttpReader
 class Feeder(object):
     """
     Base class for all item feeders
+
+    Feeders that can resume set "position" as they feed each item, to a JSON serialisable value
+    that "seek" can start the next feed from (after that item). It stays None for feeders that
+    can not resume.
     """
 
     # TODO: allow custom readers to be added
@@ -23,6 +35,15 @@ class Feeder(object):
         HttpReader
     ]
 
+    # The last reader used by the feeder
+    reader = None
+
+    # Position after the last item fed, see "seek"
+    position = None
+
+    # Position to start the next feed from
+    _start = None
+
     @property
     def logger(self):
         return logging.getLogger(type(self).__name__)
@@ -33,7 +54,51 @@ class Feeder(object):
     def feed(self, item):
         raise NotImplementedError('Item feeders must implement feed method.')
 
+    def wait(self, timeout):
+        """
+        Block until the feeder may have new items, or the timeout (in seconds) is reached
+
+        Used by long running importers while they are idle. Returns True if new data is available.
+        """
+        if self.reader is not None:
+            return self.reader.wait(timeout)
+        time.sleep(timeout)
+        return False
+
+    def seek(self, position):
+        """
+        Start the next feed after the item that was fed when "position" was saved
+
+        Feeders using a reader resume from the reader's position, see Reader.seek.
+        """
+        self._start = position
+
+    def fingerprint(self, contents=False):
+        """
+        Get a value that changes whenever the feeder's input does (see Reader.fingerprint), or
+        None if the feeder can not tell
+        """
+        uri = getattr(self, 'uri', None)
+        if uri is None:
+            return None
+        return self.find_reader(uri).fingerprint(contents)
+
+    def close(self):
+        close = getattr(self.reader, 'close', None)
+        if callable(close):
+            close()
+
     def get_reader(self, uri, **kwargs):
+        self.reader = self.find_reader(uri, **kwargs)
+        if self._start is not None:
+            self.reader.seek(self._start)
+            self._start = None
+        return self.reader
+
+    def find_reader(self, uri, **kwargs):
+        """
+        Get a reader for a URI (or the reader itself), without making it the feeder's reader
+        """
         if isinstance(uri, Reader):
             return uri
 
@@ -53,7 +118,11 @@ class ListFeeder(Feeder):
         self.items = items
 
     def feed(self, item):
-        for item in self.items:
+        # The position is the number of items fed
+        start, self._start = self._start or 0, None
+        self.position = start
+        for item in itertools.islice(self.items, start, None):
+            self.position += 1
             yield self.parse(item)
 
     def parse(self, item):
@@ -70,14 +139,17 @@ class CsvFeeder(Feeder):
 
     def feed(self, item):
         reader = self.get_reader(self.uri)
+        skip = self.skip if reader.at_start() else 0
         lines = csv.reader(reader.read(), **self.reader_args)
 
-        if self.skip > 0:
-            for i in range(self.skip):
+        if skip > 0:
+            for i in range(skip):
                 next(lines)
 
         for line in lines:
-            yield self.parse(line)
+            item = self.parse(line)
+            self.position = reader.position
+            yield item
 
     def parse(self, line):
         # Make sure we have the same number of keys and values
@@ -123,7 +195,9 @@ class JsonLinesFeeder(Feeder):
     def feed(self, item):
         reader = self.get_reader(self.uri)
         for line in reader.read():
-            yield self.parse(line)
+            item = self.parse(line)
+            self.position = reader.position
+            yield item
 
     def parse(self, line):
         try:
@@ -132,3 +206,119 @@ class JsonLinesFeeder(Feeder):
             raise ItemNotImportable('Could not load JSON string \n%r' % pprint.pformat(line))
         except TypeError:
             raise ItemNotImportable('Could not load JSON as input was not a string')
+
+
+class MergeFeeder(Feeder):
+    """
+    Feed the items from several feeders at once
+
+    Each feeder is read on its own thread, at most "prefetch" items ahead of the pipeline. Items
+    are taken from the feeders in turn, skipping any that have nothing ready, so a slow feeder
+    does not hold up the others.
+
+    :param feeders: List of feeders to read
+    :param prefetch: Max number of items read ahead from each feeder
+    :param threads: Max number of feeders read at once, defaults to all of them
+    """
+
+    # Seconds between checks for a closed feed while waiting on a queue
+    poll_interval = 0.1
+
+    def __init__(self, feeders, prefetch=100, threads=None):
+        self.feeders = feeders
+        self.prefetch = prefetch
+        self.threads = threads
+
+    def feed(self, item):
+        queues = [Queue(self.prefetch) for _ in self.feeders]
+        ready = threading.Condition()
+        stopped = threading.Event()
+        executor = ThreadPoolExecutor(self.threads or len(self.feeders) or 1)
+
+        for feeder, queue in zip(self.feeders, queues):
+            executor.submit(self._read, feeder, item, queue, ready, stopped)
+
+        try:
+            active = list(range(len(queues)))
+            turn = 0
+            while active:
+                with ready:
+                    position, result, exc_info = self._next_ready(queues, active, turn)
+                    if position is None:
+                        ready.wait(self.poll_interval)
+                        continue
+
+                if exc_info is not None:
+                    six.reraise(*exc_info)
+                elif result is None:
+                    # The feeder is finished, the next one in turn is now at this position
+                    active.pop(position)
+                    turn = position
+                else:
+                    turn = position + 1
+                    yield result
+        finally:
+            stopped.set()
+            executor.shutdown(wait=False)
+
+    def wait(self, timeout):
+        # The timeout is shared between the feeders
+        timeout = float(timeout) / max(len(self.feeders), 1)
+        return any([feeder.wait(timeout) for feeder in self.feeders])
+
+    def fingerprint(self, contents=False):
+        fingerprints = [feeder.fingerprint(contents) for feeder in self.feeders]
+        if None in fingerprints:
+            return None
+        return fingerprints
+
+    def open(self):
+        for feeder in self.feeders:
+            open_feeder = getattr(feeder, 'open', None)
+            if callable(open_feeder):
+                open_feeder()
+
+    def close(self):
+        for feeder in self.feeders:
+            feeder.close()
+
+    @staticmethod
+    def _next_ready(queues, active, turn):
+        for offset in range(len(active)):
+            position = (turn + offset) % len(active)
+            try:
+                result, exc_info = queues[active[position]].get_nowait()
+            except Empty:
+                continue
+            return position, result, exc_info
+        return None, None, None
+
+    def _read(self, feeder, item, queue, ready, stopped):
+        """
+        Put the items from a feeder on its queue, followed by None (or the exception it raised)
+        """
+        results = None
+        try:
+            results = feeder(item)
+            for result in results if results is not None else []:
+                if result is not None and not self._put(queue, (result, None), ready, stopped):
+                    return
+        except BaseException:
+            self._put(queue, (None, sys.exc_info()), ready, stopped)
+        else:
+            self._put(queue, (None, None), ready, stopped)
+        finally:
+            close = getattr(results, 'close', None)
+            if callable(close):
+                close()
+
+    def _put(self, queue, entry, ready, stopped):
+        while not stopped.is_set():
+            try:
+                queue.put(entry, timeout=self.poll_interval)
+            except Full:
+                continue
+            with ready:
+                ready.notify()
+            return True
+        return False
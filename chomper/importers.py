@@ -2,11 +2,23 @@ import types
 import six
 import time
 import logging
-from copy import copy
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from multiprocessing.util import Finalize
+from timeit import default_timer as timer
 
+from chomper.concurrency import IoBound, Spool, StageQueue
 from chomper.exceptions import ImporterMethodNotFound, ItemNotImportable, DropItem
-from chomper.items import Item
-from chomper.utils import smart_invoke
+from chomper.feeders import Feeder
+from chomper.items import Item, Field, fork
+from chomper.plan import ExecutionPlan, ACTION, BRANCH, DONE, CONCURRENT
+from chomper.stats import action_name
+from chomper.support.checkpoint import CheckpointStore
+from chomper.support.spill import SpillBuffer
+from chomper.support.spool import SpoolQueue
+from chomper.utils import smart_invoke, chunked
 
 
 class ImporterMethod(object):
@@ -21,15 +33,119 @@ class ImporterMetaclass(type):
         return ImporterMethod(name)
 
 
+# Importer (and the step to start from) used by the current worker process
+_worker_importer = None
+_worker_start = 0
+
+
+def _init_worker(importer, start):
+    global _worker_importer, _worker_start
+    _worker_importer = importer
+    _worker_start = start
+    # Each worker opens its own connections and closes them when the pool shuts down
+    importer._open_actions(importer.pipeline)
+    importer._branch_executor = None
+    Finalize(importer, importer.close, exitpriority=10)
+
+
+def _run_worker_chunk(items, collect):
+    return run_chunk(_worker_importer, items, _worker_start, collect)
+
+
+def run_chunk(importer, items, start, collect=False):
+    """
+    Run a chunk of items through an importer's pipeline from the step at "start"
+
+    Returns the items that reached the end (if "collect" is true), the number of items processed
+    and dropped and the stats of each step, for the importer that fed the items to merge.
+    """
+    dropped = importer.items_dropped
+    outputs = list(importer._iter_items(items, start))
+    for item in outputs:
+        importer._item_exported(item)
+    importer._items_exported()
+    # Stats are reset after each chunk, so the feeding importer can add them to its own
+    stats = [stats.snapshot(reset=True) for stats in importer.plan.iter_stats()]
+    return outputs if collect else [], len(outputs), importer.items_dropped - dropped, stats
+
+
+def _get_pool_context():
+    """
+    Worker processes are forked so they inherit the importer (and its pipeline) without pickling
+    """
+    try:
+        return multiprocessing.get_context('fork')
+    except (AttributeError, ValueError):
+        return multiprocessing
+
+
 @six.add_metaclass(ImporterMetaclass)
 class Importer(object):
     """
     Base class for all importers
+
+    Set "workers" to run the pipeline after the feeder in a pool of worker processes. Items
+    created by the feeder are sent to the workers in chunks of "chunk_size" items. If "ordered"
+    is false, results are collected from the workers in the order they finish.
+
+    Set "partition_by" to a list of field names (or fields) to keep items that share the same
+    values for them in order when using workers, see "_iter_partitioned".
+
+    Use "arun" to run the pipeline on an asyncio event loop instead, with at most "concurrency"
+    items in flight at once.
+
+    Stage markers in the pipeline split it into stages that each run on their own thread, passing
+    items on through bounded queues (see Stage).
+
+    Set "memory_budget" (in bytes) to limit the memory used by items waiting between stages or in
+    partition buffers. Items over the budget are spilled to temporary files in "spill_dir" and
+    read back in order, instead of making the feeder wait.
+
+    Set "checkpoint_path" to save the position of the feeder to a file each time the items from
+    another "checkpoint_interval" items it fed have finished. A run that stopped part way through
+    is resumed from the last position the next time, see "_iter_checkpointed".
+
+    "fingerprint_path" is the SQLite database used by Item.skip_unchanged to remember the items
+    exported by earlier runs. Actions with an "item_exported" method are given each item that
+    makes it to the end of the pipeline. Actions with an "items_exported" method have it called
+    whenever every item run so far has finished: after each run, checkpoint or chunk run by a
+    worker process.
+
+    Set "input_fingerprint_path" to skip runs while the feeders' inputs are the same as they were
+    for the last successful run (going by file sizes and modification times, or HTTP ETag and
+    Last-Modified headers). Set "input_hash" to compare a hash of each file's contents instead of
+    its modification time. Skipped runs are counted in "runs_skipped".
+
+    Set "branch_threads" to run sibling branches (consecutive nested lists) at the same time on a
+    pool of threads. The item only continues once all of the branches have finished with it.
+
+    If "close_when_idle" is false the pipeline is run again once the feeders signal new data, or
+    after "idle_delay" seconds. The wait doubles up to "max_idle_delay" seconds while runs handle
+    no items.
+
+    Calls to each action are counted and timed unless "collect_stats" is false, see "stats".
     """
 
     name = None
     pipeline = None
     close_when_idle = True
+    batch_size = 1
+    workers = 0
+    ordered = True
+    chunk_size = 100
+    concurrency = 100
+    idle_delay = 1.0
+    max_idle_delay = 5.0
+    collect_stats = True
+    branch_threads = 0
+    partition_by = None
+    memory_budget = None
+    spill_dir = None
+    checkpoint_path = None
+    checkpoint_interval = 1000
+    fingerprint_path = None
+    input_fingerprint_path = None
+    input_hash = False
 
     def __init__(self, name=None, **kwargs):
         if name is not None:
@@ -43,68 +159,786 @@ class Importer(object):
 
         self.items_processed = 0
         self.items_dropped = 0
+        self.runs_skipped = 0
+        self._lock = threading.Lock()
+        # Items rejected on each thread, see "_run_item"
+        self._rejections = threading.local()
+        self._branch_executor = None
 
         for key, value in six.iteritems(kwargs):
             setattr(self, key, value)
 
+        self.plan = ExecutionPlan(self.pipeline, stats=self.collect_stats)
+        # Called with each item that reaches the end of the pipeline
+        self._export_hooks = [action.item_exported for action in self._iter_actions(self.pipeline)
+                              if callable(getattr(action, 'item_exported', None))]
+        self._stage_queues = []
+        self._partition_buffers = []
+        for number, index in enumerate(self.plan.stages, 1):
+            stage = self.pipeline[index]
+            name = stage.name or 'stage %d' % number
+            if isinstance(stage, Spool):
+                self._stage_queues.append(
+                    SpoolQueue(stage.path, name, stage.batch_size, stage.max_retries, stage.retry_delay))
+            else:
+                budget = self._budget_share(len(self.plan.stages))
+                self._stage_queues.append(StageQueue(stage.size, name, budget, self.spill_dir))
+
     @property
     def logger(self):
         return logging.getLogger(self.name)
 
     def run(self):
-        while True:
-            self._traverse(Item(), copy(self.pipeline))
-            if self.close_when_idle:
-                break
+        for _ in self._iter_runs(collect=False):
+            pass
+
+    def iter(self):
+        """
+        Run the pipeline, lazily yielding the items that reach the end of it
+
+        Feeders are only read as the items are consumed (plus whatever is buffered by batches,
+        stages or worker chunks). The actions are closed once the pipeline is done or the
+        generator is closed.
+        """
+        return self._iter_runs(collect=True)
+
+    def stats(self):
+        """
+        Get the importer's counters along with the counters and call durations of each action
+
+        Can be called while the importer is running. Durations are in seconds.
+        """
+        stages = [queue.stats() for queue in self._stage_queues]
+        return dict(
+            items_processed=self.items_processed,
+            items_dropped=self.items_dropped,
+            runs_skipped=self.runs_skipped,
+            actions=[stats.as_dict() for stats in self.plan.iter_stats()],
+            stages=stages,
+            spilled_items=sum(stats['spilled_items'] for stats in stages) + sum(
+                buffer.spilled_items for buffer in self._partition_buffers),
+            spilled_bytes=sum(stats['spilled_bytes'] for stats in stages) + sum(
+                buffer.spilled_bytes for buffer in self._partition_buffers)
+        )
+
+    def _budget_share(self, count):
+        """
+        Split the memory budget between buffers
+        """
+        if self.memory_budget is None:
+            return None
+        return self.memory_budget // max(count, 1)
+
+    def _iter_runs(self, collect):
+        delay = self.idle_delay
+        try:
+            while True:
+                handled = self.items_processed + self.items_dropped
+                for item in self._iter_once(collect):
+                    yield item
+                if self.close_when_idle:
+                    break
+                delay = self._wait_between_runs(delay, handled)
+        finally:
+            self.close()
+
+    def _wait_between_runs(self, delay, handled):
+        """
+        Wait before the next run, returning how long to wait after that one
+
+        Feeders that read their whole input again (lists, files without "follow", HTTP) handle
+        items on every run, so there is always a wait between runs. It is cut short when a feeder
+        signals new data. The wait backs off while runs handle no items.
+        """
+        new_data = self._wait_for_data(delay)
+        if new_data or self.items_processed + self.items_dropped > handled:
+            return self.idle_delay
+        return min(delay * 2, self.max_idle_delay)
+
+    def _iter_once(self, collect):
+        """
+        Run the pipeline once, with worker processes or stages if they are used
+
+        Worker processes only send their items back when "collect" is true.
+        """
+        inputs = self._fingerprint_inputs()
+        if self._inputs_unchanged(inputs):
+            return
+
+        if self.workers > 1:
+            for item in (self._iter_partitioned(collect) if self.partition_by else self._iter_parallel(collect)):
+                yield item
+        else:
+            if self.plan.stages:
+                items = self._iter_staged()
+            elif self.checkpoint_path:
+                items = self._iter_checkpointed()
             else:
-                time.sleep(1)
-                continue
-        self.close()
+                items = self._iter_items([Item()])
+            for item in items:
+                self.items_processed += 1
+                self._item_exported(item)
+                yield item
+        self._items_exported()
+        self._save_inputs(inputs)
+
+    def _fingerprint_inputs(self):
+        """
+        Get the fingerprints of the feeders' inputs, or None if they are not checked or any of the
+        feeders can not tell whether its input changed
+        """
+        if not self.input_fingerprint_path:
+            return None
+        fingerprints = [feeder.fingerprint(self.input_hash) for feeder in self._get_feeders()]
+        if not fingerprints or None in fingerprints:
+            return None
+        return fingerprints
+
+    def _inputs_unchanged(self, inputs):
+        """
+        Check if the inputs are the same as for the last successful run, counting the run as skipped if so
+        """
+        if inputs is None or CheckpointStore(self.input_fingerprint_path).get(self._inputs_key) != inputs:
+            return False
+        self.logger.info('Skipping %s, the inputs have not changed since the last run' % self.name)
+        self.runs_skipped += 1
+        return True
+
+    def _save_inputs(self, inputs):
+        if inputs is not None:
+            CheckpointStore(self.input_fingerprint_path).save(self._inputs_key, inputs)
+
+    @property
+    def _inputs_key(self):
+        # The same file can hold checkpoints, which are saved by importer name
+        return '%s:inputs' % self.name
+
+    def _get_feeders(self):
+        return [step.action for step in self.plan if step.op == ACTION and isinstance(step.action, Feeder)]
+
+    def _wait_for_data(self, timeout):
+        """
+        Wait for any of the feeders to signal that new data is available
+
+        Feeders block on their reader where possible (e.g. a Redis queue or a followed file),
+        otherwise this is just a sleep.
+        """
+        feeders = self._get_feeders()
+
+        if not feeders:
+            time.sleep(timeout)
+            return False
+
+        for feeder in feeders:
+            if feeder.wait(float(timeout) / len(feeders)):
+                return True
+        return False
+
+    def arun(self):
+        """
+        Run the pipeline on the current asyncio event loop (Python 3.6+)
+
+        Returns a coroutine. Feeders may be async generators and exporters may return awaitables.
+        Batching and worker processes are not used when running on an event loop.
+        """
+        from chomper.aio import arun
+        return arun(self)
+
+    def open(self):
+        """
+        Open the actions again after the importer was closed, so it can be run again
+        """
+        self._open_actions(self.pipeline)
 
     def close(self):
         self._close_actions(self.pipeline)
+        if self._branch_executor is not None:
+            self._branch_executor.shutdown()
+            self._branch_executor = None
+
+    def _open_actions(self, actions):
+        self._call_actions(actions, 'open')
 
     def _close_actions(self, actions):
+        self._call_actions(actions, 'close')
+
+    def _items_exported(self):
+        self._call_actions(self.pipeline, 'items_exported')
+
+    def _item_exported(self, item):
+        for hook in self._export_hooks:
+            hook(item)
+
+    def _call_actions(self, actions, name):
+        """
+        Call a method on every action (including nested and wrapped actions) that has it
+        """
+        for action in self._iter_actions(actions):
+            try:
+                method = getattr(action, name)
+            except AttributeError:
+                continue
+            method()
+
+    def _iter_actions(self, actions):
         for action in actions:
             if isinstance(action, list):
-                self._close_actions(action)
+                for nested in self._iter_actions(action):
+                    yield nested
+            else:
+                if isinstance(action, IoBound):
+                    for wrapped in self._iter_actions(action.actions):
+                        yield wrapped
+                yield action
+
+    def _iter_items(self, items, start=0, plan=None):
+        """
+        Run items through the execution plan, yielding the items that reach the end of the pipeline
+        """
+        if self.batch_size > 1:
+            for batch in chunked(items, self.batch_size):
+                for results in self._execute_batch(batch, start, plan):
+                    for item in results:
+                        yield item
+        else:
+            for item in items:
+                for result in self._execute(item, start, plan):
+                    yield result
+
+    def _iter_parallel(self, collect=False):
+        """
+        Run the pipeline using a pool of worker processes
+
+        The pipeline up to (and including) the first feeder is run in this process. Chunks of the
+        items it creates are then run through the rest of the pipeline by the workers. At most two
+        chunks per worker are in flight at a time, so the feeder is only read as fast as the
+        workers can keep up.
+        """
+        split = self._split_index()
+        head = self.plan.until(split + 1)
+        chunks = chunked(self._iter_items([Item()], plan=head), self.chunk_size)
+
+        pool = _get_pool_context().Pool(self.workers, _init_worker, (self, split + 1))
+        pending = deque()
+
+        try:
+            for chunk in chunks:
+                pending.append(pool.apply_async(_run_worker_chunk, (chunk, collect)))
+                while pending and (len(pending) >= self.workers * 2 or not self.ordered and pending[0].ready()):
+                    for item in self._merge_worker_result(self._next_worker_result(pending)):
+                        yield item
+            while pending:
+                for item in self._merge_worker_result(self._next_worker_result(pending)):
+                    yield item
+        except BaseException:
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
+
+    def _iter_staged(self):
+        """
+        Run each stage of the pipeline on its own thread, yielding the items from the last stage
+
+        Every stage but the last runs on a new thread and puts the items reaching its end on the
+        queue for the next stage. The last stage runs on the calling thread. Exceptions are passed down
+        through the queues and raised here.
+        """
+        threads = []
+        items, start = [Item()], 0
+
+        for index, queue in zip(self.plan.stages, self._stage_queues):
+            queue.open()
+            thread = threading.Thread(target=queue.feed, args=(self._iter_stage(items, start, self.plan.until(index)),))
+            thread.daemon = True
+            threads.append(thread)
+            items, start = queue, index + 1
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in self._iter_stage(items, start):
+                yield item
+        finally:
+            for queue in self._stage_queues:
+                queue.close()
+            for thread in threads:
+                thread.join()
+
+    def _iter_checkpointed(self):
+        """
+        Run the pipeline, saving the feeder's position each time the items it fed have finished
+
+        Items are fed in segments of "checkpoint_interval" items. Each segment runs through the
+        rest of the pipeline (including any IoBound actions) before the position after its last
+        item is saved, so a saved position never skips items that did not make it to the end.
+        The position is removed once the feeder is done, so the next run starts from the start.
+        Feeders that can not resume (their position is None) run without checkpoints.
+        """
+        split = self._split_index()
+        feeder = self.pipeline[split]
+        checkpoints = CheckpointStore(self.checkpoint_path)
+
+        position = checkpoints.get(self.name)
+        if position is not None:
+            self.logger.info('Resuming %s from position %r' % (self.name, position))
+            feeder.seek(position)
+
+        # Items are taken from the feeder one at a time, so its position is after the last one taken
+        items = self._execute(Item(), plan=self.plan.until(split + 1))
+        for segment in chunked(items, self.checkpoint_interval):
+            position = getattr(feeder, 'position', None)
+            if self.batch_size > 1:
+                for results in self._execute_batches(chunked(segment, self.batch_size), split + 1):
+                    for item in results:
+                        yield item
             else:
+                for item in self._execute_all(segment, split + 1):
+                    yield item
+            self._items_exported()
+            if position is not None:
+                checkpoints.save(self.name, position)
+
+        checkpoints.delete(self.name)
+
+    def _iter_stage(self, items, start, plan=None):
+        """
+        Run the items of a stage (from the queue of the stage before) through the execution plan
+        """
+        if isinstance(items, SpoolQueue):
+            return self._iter_spooled(items, start, plan)
+        return self._iter_items(items, start, plan)
+
+    def _iter_spooled(self, spool, start, plan=None):
+        """
+        Drain a spool, running each batch through the execution plan before it is acknowledged
+
+        A failing batch is run again (from fresh copies of its items) after a delay, so the stage
+        before the spool keeps going while an exporter is down for a short while.
+        """
+        for rows in spool:
+            delay = spool.retry_delay
+            for attempt in range(spool.max_retries + 1):
                 try:
-                    action.close()
-                except AttributeError:
-                    continue
+                    # Drained items always run as a batch of the spool's size, so exporters get
+                    # whole batches whatever the importer's batch size is
+                    batches = self._execute_batch(spool.load(rows), start, plan, size=spool.batch_size)
+                    results = [item for items in batches for item in items]
+                    break
+                except Exception:
+                    if attempt >= spool.max_retries:
+                        raise
+                    self.logger.exception('Error draining %s, retrying in %s seconds' % (spool.name, delay))
+                    spool.retries += 1
+                    time.sleep(delay)
+                    delay *= 2
+
+            for item in results:
+                yield item
+            spool.ack(rows)
+
+    def _iter_partitioned(self, collect=False):
+        """
+        Run the pipeline using a pool of worker processes, keeping items with the same key in order
+
+        Items created by the feeder are hash partitioned on their "partition_by" values into one
+        partition per worker. Each partition has at most one chunk running at a time, so items with
+        the same key are run one after another in the order they were fed, while items in other
+        partitions run in parallel. Results are yielded in order within each partition.
+
+        A partition makes the feeder wait once it has two chunks of items waiting, unless there is
+        a memory budget, then waiting items over the budget are spilled to disk.
+        """
+        split = self._split_index()
+        head = self.plan.until(split + 1)
+        fields = [field if isinstance(field, Field) else Field(field) for field in self.partition_by]
+        if len(self._partition_buffers) != self.workers:
+            budget = self._budget_share(self.workers)
+            self._partition_buffers = [SpillBuffer(budget, directory=self.spill_dir) for _ in range(self.workers)]
+        buffers = self._partition_buffers
+        limit = self.chunk_size * 2 if self.memory_budget is None else None
+        running = [None] * self.workers
+        pool = _get_pool_context().Pool(self.workers, _init_worker, (self, split + 1))
+
+        def flush(partition, block):
+            # Collect the partition's running chunk (if it is done) and start the next one
+            outputs = []
+            if running[partition] is not None:
+                if not block and not running[partition].ready():
+                    return outputs
+                outputs = self._merge_worker_result(running[partition].get())
+                running[partition] = None
+            if buffers[partition]:
+                running[partition] = pool.apply_async(_run_worker_chunk, (buffers[partition].take(self.chunk_size),
+                                                                          collect))
+            return outputs
 
-    def _traverse(self, item, actions):
         try:
-            action = actions.pop(0)
-        except IndexError:
-            self.items_processed += 1
+            for item in self._iter_items([Item()], plan=head):
+                partition = self._partition(item, fields)
+                buffers[partition].append(item)
+                if len(buffers[partition]) >= self.chunk_size:
+                    # Only wait for the partition once it has another full chunk queued up
+                    for output in flush(partition, limit is not None and len(buffers[partition]) >= limit):
+                        yield output
+            while any(running) or any(buffers):
+                for partition in range(self.workers):
+                    for output in flush(partition, True):
+                        yield output
+        except BaseException:
+            pool.terminate()
+            raise
         else:
-            for item in self._make_iterable(item):
-                if isinstance(action, list):
-                    self._traverse(copy(item), copy(actions))
+            pool.close()
+        finally:
+            pool.join()
+            for buffer in buffers:
+                buffer.clear()
+
+    def _partition(self, item, fields):
+        key = tuple(item[field] for field in fields)
+        try:
+            return hash(key) % self.workers
+        except TypeError:
+            # Unhashable values (e.g. dicts)
+            return hash(repr(key)) % self.workers
+
+    def _next_worker_result(self, pending):
+        if not self.ordered:
+            for result in pending:
+                if result.ready():
+                    pending.remove(result)
+                    return result.get()
+        return pending.popleft().get()
+
+    def _merge_worker_result(self, result):
+        outputs, processed, dropped, snapshots = result
+        self.items_processed += processed
+        self.items_dropped += dropped
+        for stats, snapshot in zip(self.plan.iter_stats(), snapshots):
+            stats.merge(snapshot)
+        return outputs
+
+    def _split_index(self):
+        """
+        Get the index of the top level action that feeds items to worker processes
+        """
+        for index, action in enumerate(self.pipeline):
+            if isinstance(action, Feeder):
+                return index
+        return 0
+
+    def _execute(self, item, start=0, plan=None, concurrent_branches=True):
+        """
+        Run an item through the compiled execution plan, see "_execute_all"
+        """
+        return self._execute_all([item], start, plan, concurrent_branches)
+
+    def _execute_all(self, items, start=0, plan=None, concurrent_branches=True):
+        """
+        Run items through the compiled execution plan
+
+        Items waiting to continue through the pipeline are kept on a stack of (step index, items)
+        frames, so each item is run depth first without copying the remaining actions. Items that
+        reach the end of the pipeline are yielded.
+
+        Items handed to a thread pool by a concurrent step are kept in a queue of pending results.
+        Finished results are pushed back onto the stack as soon as they are ready, or once the step
+        has too many items in flight.
+
+        Sibling branches are run on the branch thread pool when "branch_threads" is set, unless
+        "concurrent_branches" is false (for items already running on a pool thread).
+        """
+        plan = plan or self.plan
+        steps = plan.steps
+        siblings = plan.siblings if self.branch_threads and concurrent_branches else {}
+        stack = [(start, iter(items))]
+        pending = deque()
+        in_flight = {}
+
+        while stack or pending:
+            if pending and (not stack or pending[0][0].done()):
+                self._resume_pending(pending, stack, in_flight)
+                continue
+
+            index, items = stack[-1]
+            try:
+                item = next(items)
+            except StopIteration:
+                stack.pop()
+                continue
+
+            while True:
+                op, action, next_index, _, stats, invoke = steps[index]
+                if op == ACTION:
+                    result = self._invoke_action(action, [item, self], stats, invoke)
+                    if not result:
+                        break
+                    elif isinstance(result, (list, tuple, types.GeneratorType)):
+                        stack.append((next_index, iter(self._make_iterable(result))))
+                        break
+                    item = result
+                    index = next_index
+                elif op == BRANCH:
+                    if index in siblings:
+                        starts, index = siblings[index]
+                        self._run_siblings(starts, [item], plan)
+                        continue
+                    # Run the branch on a (copy-on-write) copy of the item before the item continues
+                    stack.append((next_index, iter([item])))
+                    stack.append((action, iter([fork(item)])))
+                    break
+                elif op == CONCURRENT:
+                    self._submit_pending(action, plan.concurrent[index], index, next_index, [item], pending, stack,
+                                         in_flight)
+                    break
                 else:
-                    result = self._invoke_action(action, [item, self])
-                    if result:
-                        self._traverse(result, copy(actions))
+                    if op == DONE:
+                        yield item
+                    break
 
-    @staticmethod
-    def _make_iterable(item):
-        is_generator = isinstance(item, types.GeneratorType)
-        is_list = isinstance(item, list) or isinstance(item, tuple)
-        return [item for item in (item if is_list or is_generator else [item]) if item is not None]
+    def _execute_batch(self, items, start=0, plan=None, concurrent_branches=True, size=None):
+        """
+        Run a list of items through the compiled execution plan, see "_execute_batches"
+        """
+        return self._execute_batches([items], start, plan, concurrent_branches, size)
+
+    def _execute_batches(self, batches, start=0, plan=None, concurrent_branches=True, size=None):
+        """
+        Run lists of items through the compiled execution plan, one step at a time
 
-    def _invoke_action(self, action, action_args):
-        if callable(action):
+        Actions implementing a batch method are given the whole list, all other actions are
+        invoked for each item. Results are regrouped into lists of at most "size" items (the
+        importer's "batch_size" by default). Lists of items that reach the end of the pipeline
+        are yielded.
+        """
+        size = size or self.batch_size
+        plan = plan or self.plan
+        steps = plan.steps
+        siblings = plan.siblings if self.branch_threads and concurrent_branches else {}
+        stack = [(start, iter(batches))]
+        pending = deque()
+        in_flight = {}
+
+        while stack or pending:
+            if pending and (not stack or pending[0][0].done()):
+                self._resume_pending(pending, stack, in_flight)
+                continue
+
+            index, batches = stack[-1]
             try:
-                return smart_invoke(action, action_args)
-            except DropItem:
-                self.items_dropped += 1
-            except ItemNotImportable as e:
-                self.logger.error(e.message)
-                self.items_dropped += 1
+                items = next(batches)
+            except StopIteration:
+                stack.pop()
+                continue
+
+            while items:
+                op, action, next_index, batch, stats, invoke = steps[index]
+                if op == ACTION:
+                    if batch is None:
+                        results = self._iter_action_results(action, items, stats, invoke)
+                        stack.append((next_index, chunked(results, size)))
+                        break
+                    items = self._invoke_batch(batch, items, stats, action, invoke)
+                    index = next_index
+                elif op == BRANCH:
+                    if index in siblings:
+                        starts, index = siblings[index]
+                        self._run_siblings(starts, items, plan, size)
+                        continue
+                    stack.append((next_index, iter([items])))
+                    stack.append((action, iter([[fork(item) for item in items]])))
+                    break
+                elif op == CONCURRENT:
+                    self._submit_pending(action, plan.concurrent[index], index, next_index, items, pending, stack,
+                                         in_flight, size)
+                    break
+                else:
+                    if op == DONE:
+                        yield items
+                    break
+
+    def _submit_pending(self, concurrent, concurrent_plan, index, next_index, items, pending, stack, in_flight,
+                        size=None):
+        while in_flight.get(index, 0) >= concurrent.in_flight:
+            self._resume_pending(pending, stack, in_flight)
+
+        # Lists of items from "_execute_batches" (with a batch size) are run through the wrapped
+        # actions as a batch
+        if size is None:
+            future = concurrent.submit(self._run_item, items, concurrent_plan)
         else:
+            future = concurrent.submit(self._run_batch, items, concurrent_plan, size)
+        pending.append((future, index, next_index))
+        in_flight[index] = in_flight.get(index, 0) + 1
+
+    def _resume_pending(self, pending, stack, in_flight):
+        future, index, next_index = pending.popleft()
+        in_flight[index] -= 1
+        outputs, _ = future.result()
+        stack.append((next_index, iter(outputs)))
+
+    def _run_item(self, items, plan):
+        """
+        Run an item through a concurrent step's plan on a pool thread
+
+        Returns the items that reach the end of the plan, and whether any item was rejected on the
+        way (so an adaptive limit can back off while the run carries on).
+        """
+        self._rejections.count = 0
+        outputs = list(self._execute(items[0], plan=plan, concurrent_branches=False))
+        return outputs, self._rejections.count > 0
+
+    def _run_batch(self, items, plan, size=None):
+        self._rejections.count = 0
+        outputs = list(self._execute_batch(items, plan=plan, concurrent_branches=False, size=size))
+        return outputs, self._rejections.count > 0
+
+    def _run_siblings(self, starts, items, plan, size=None):
+        """
+        Run sibling branches at the same time on the branch thread pool and wait for all of them
+
+        Branches nested inside of these are run one after another, so pool threads never wait on
+        the pool themselves.
+        """
+        if self._branch_executor is None:
+            self._branch_executor = ThreadPoolExecutor(self.branch_threads)
+
+        futures = []
+        for start in starts:
+            if size is not None:
+                branch = self._execute_batch([fork(item) for item in items], start, plan, False, size)
+            else:
+                branch = self._execute(fork(items[0]), start, plan, False)
+            # Branches end with an END step, so they never yield any items
+            futures.append(self._branch_executor.submit(list, branch))
+
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    def _iter_action_results(self, action, items, stats=None, invoke=None):
+        for item in items:
+            result = self._invoke_action(action, [item, self], stats, invoke)
+            if not result:
+                continue
+            elif isinstance(result, (list, tuple, types.GeneratorType)):
+                for _item in self._make_iterable(result):
+                    yield _item
+            else:
+                yield result
+
+    def _invoke_batch(self, batch, items, stats=None, action=None, invoke=None):
+        """
+        Invoke an action's batch method with a list of items
+
+        Batch methods return the items that continue, returning None drops the whole batch (with a
+        warning). A batch method raising ItemNotImportable rejects the whole batch (e.g. a database insert
+        that was rolled back because of one bad row). The action is then called for each item
+        instead, so only the items that fail on their own are dropped.
+        """
+        exceptions = 0
+        start = timer()
+        try:
+            result = smart_invoke(batch, [items, self])
+            if result is None and items:
+                self.logger.warning('%s returned None for a batch of %d items, they are counted as dropped. Batch '
+                                    'methods should return the items that continue.' %
+                                    (action_name(action if action is not None else batch), len(items)))
+            results = list(self._make_iterable(result or []))
+        except DropItem:
+            results = []
+        except ItemNotImportable as e:
+            self._count_rejected()
+            if action is not None and len(items) > 1:
+                self.logger.warning('%s Importing the %d items in the batch one at a time.' % (e, len(items)))
+                if stats is not None:
+                    # The items are counted by the calls for each item
+                    stats.record(timer() - start, 0, exceptions=1)
+                return list(self._iter_action_results(action, items, stats, invoke))
+            self.logger.error(str(e))
+            results = []
+            exceptions = 1
+        except Exception:
+            if stats is not None:
+                stats.record(timer() - start, len(items), exceptions=1)
+            raise
+
+        # Batch methods leave out the items they drop
+        dropped = max(len(items) - len(results), 0)
+        self._count_dropped(dropped)
+
+        if stats is not None:
+            stats.record(timer() - start, len(items), len(results), dropped, exceptions)
+
+        return results
+
+    @staticmethod
+    def _make_iterable(result):
+        """
+        Get the items in an action result
+
+        Generators (e.g. from feeders) are consumed lazily, so only the items currently moving
+        through the pipeline are held in memory rather than the whole input.
+        """
+        if isinstance(result, types.GeneratorType):
+            return (item for item in result if item is not None)
+        elif isinstance(result, (list, tuple)):
+            return [item for item in result if item is not None]
+        return [result] if result is not None else []
+
+    def _invoke_action(self, action, action_args, stats=None, invoke=None):
+        if not callable(action):
             self.logger.warn('Action "%s" could not be called. Must be a callable or importer method.' % action)
+            return None
+
+        start = timer()
+        try:
+            result = invoke(action_args) if invoke is not None else smart_invoke(action, action_args)
+        except DropItem:
+            self._count_dropped()
+            if stats is not None:
+                stats.record(timer() - start, dropped=1)
+            return None
+        except ItemNotImportable as e:
+            self.logger.error(str(e))
+            self._count_dropped()
+            self._count_rejected()
+            if stats is not None:
+                stats.record(timer() - start, dropped=1, exceptions=1)
+            return None
+        except Exception:
+            if stats is not None:
+                stats.record(timer() - start, exceptions=1)
+            raise
+
+        if stats is not None:
+            return self._record_result(stats, result, start)
+        return result
+
+    @staticmethod
+    def _record_result(stats, result, start):
+        if isinstance(result, types.GeneratorType):
+            # Time spent creating the items is counted as they are pulled from the generator
+            return stats.iter_timed(result, timer() - start)
+        elif isinstance(result, (list, tuple)):
+            stats.record(timer() - start, items_out=len(result))
+        else:
+            stats.record(timer() - start, items_out=1 if result else 0)
+        return result
+
+    def _count_dropped(self, count=1):
+        # Actions may be running on several threads
+        with self._lock:
+            self.items_dropped += count
+
+    def _count_rejected(self):
+        # Only counted on the threads running a concurrent step's plan
+        if hasattr(self._rejections, 'count'):
+            self._rejections.count += 1
 
     def get_method(self, method):
         if hasattr(self, method.name):
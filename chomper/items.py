@@ -1,4 +1,5 @@
 import six
+from copy import copy
 
 from .utils import AttrDict, path_split, path_get, path_set, path_del, path_exists
 
@@ -172,6 +173,11 @@ class ItemMetaclass(type):
         from .processors import Omitter
         return Omitter(fields, **kwargs)
 
+    @staticmethod
+    def skip_unchanged(key, fields=None, **kwargs):
+        from .processors import UnchangedSkipper
+        return UnchangedSkipper(Item, key, fields, **kwargs)
+
     @staticmethod
     def log(*args, **kwargs):
         from .processors import Logger
@@ -181,9 +187,49 @@ class ItemMetaclass(type):
 @six.add_metaclass(ItemMetaclass)
 class Item(AttrDict):
 
+    # Nested values copied by this item since it was last forked (by id), unset for items that
+    # have never been forked
+    __slots__ = ('_owned',)
+
     def __repr__(self):
         return 'Item(%s)' % dict(self)
 
+    def __copy__(self):
+        return type(self)(self)
+
+    def fork(self, data=None):
+        """
+        Create a copy of the item that shares nested values with this item (copy-on-write)
+
+        Nested dicts and lists are only copied when they are written to through a field path,
+        and only the containers along that path are copied. Both items are affected, so writes
+        to this item after the fork do not leak into the new item either.
+        """
+        item = type(self)(self if data is None else data)
+        self._owned = item._owned = {}
+        return item
+
+    def writable(self, field):
+        """
+        Get the value of a field, copying any shared containers on its path (and the value itself)
+        """
+        return self._unshare(path_split(field.get_path()))
+
+    def _unshare(self, keys):
+        owned = getattr(self, '_owned', None)
+        obj = self
+        for key in keys:
+            try:
+                value = obj[key]
+            except (KeyError, AttributeError, TypeError, IndexError):
+                return None
+            if owned is not None and isinstance(value, (dict, list)) and id(value) not in owned:
+                value = copy(value)
+                owned[id(value)] = value
+                obj[key] = value
+            obj = value
+        return obj
+
     def __getitem__(self, key):
         if isinstance(key, Field):
             return path_get(key.get_path(), self)
@@ -198,24 +244,28 @@ class Item(AttrDict):
 
     def __setitem__(self, key, value):
         if isinstance(key, Field):
+            self._unshare(path_split(key.get_path())[:-1])
             path_set(key.get_path(), self, value)
         else:
             super(Item, self).__setitem__(key, value)
 
     def __setattr__(self, key, value):
         if isinstance(key, Field):
+            self._unshare(path_split(key.get_path())[:-1])
             path_set(key.get_path(), self, value)
         else:
             super(Item, self).__setattr__(key, value)
 
     def __delitem__(self, key):
         if isinstance(key, Field):
+            self._unshare(path_split(key.get_path())[:-1])
             path_del(key.get_path(), self)
         else:
             super(Item, self).__delitem__(key)
 
     def __delattr__(self, key):
         if isinstance(key, Field):
+            self._unshare(path_split(key.get_path())[:-1])
             path_del(key.get_path(), self)
         else:
             super(Item, self).__delattr__(key)
@@ -241,6 +291,15 @@ class Item(AttrDict):
         return fn(_val(expression.left), _val(expression.right))
 
 
+def fork(item):
+    """
+    Copy an item for a pipeline branch, items created by the pipeline are copied on write
+    """
+    if isinstance(item, Item):
+        return item.fork()
+    return copy(item)
+
+
 class Selector(object):
 
     def __init__(self, selection):
@@ -0,0 +1,135 @@
+from collections import namedtuple
+from copy import copy
+
+from chomper.concurrency import IoBound, Stage
+from chomper.stats import ActionStats, action_name
+from chomper.utils import invoker
+
+
+# Step opcodes
+ACTION = 0
+BRANCH = 1
+END = 2
+DONE = 3
+CONCURRENT = 4
+
+
+# Optional methods an action can implement to receive a whole list of items at once
+BATCH_METHODS = ('process_batch', 'export_batch')
+
+
+Step = namedtuple('Step', ['op', 'action', 'next', 'batch', 'stats', 'invoke'])
+
+
+def batch_method(action):
+    """
+    Get the batch method implemented by an action (or None if it only accepts single items)
+    """
+    for name in BATCH_METHODS:
+        method = getattr(action, name, None)
+        if callable(method):
+            return method
+    return None
+
+
+class ExecutionPlan(object):
+    """
+    Flattened, index based representation of an importer pipeline
+
+    Each action becomes a step that points at the index of the step that follows it. Nested
+    lists (branches) are compiled into their own block of steps ending with an END step, while
+    the top level pipeline ends with a DONE step. Branch blocks are placed after the block
+    they were declared in, so the top level pipeline always starts at index 0.
+
+    For branch steps the action is the index of the first step in the branch. Actions wrapped in
+    IoBound become a single concurrent step. The wrapped actions are compiled into a plan of their
+    own, which "concurrent" maps the step's index to. Every plan compiles these again, so each
+    importer has its own stats for them.
+
+    Unless "stats" is false, each action step also gets an ActionStats object to record its calls.
+    Callable actions are given an invoker, so their arguments are only resolved when compiling.
+
+    "stages" holds the indexes of the Stage markers in the top level pipeline.
+
+    Consecutive branch steps in a block are siblings, "siblings" maps the index of the first one
+    to a tuple of the branch start indexes and the index of the step that follows them.
+    """
+
+    def __init__(self, pipeline, stats=True):
+        self.steps = []
+        self.siblings = {}
+        self.concurrent = {}
+        self.stages = [index for index, action in enumerate(pipeline) if isinstance(action, Stage)]
+        self._stats = stats
+        self._compile_block(pipeline, DONE)
+        self.steps = tuple(Step(*step) for step in self.steps)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def until(self, index):
+        """
+        Get a copy of the plan that ends before the top level step at the given index
+
+        The copy shares its steps (and their stats) with this plan.
+        """
+        plan = copy(self)
+        steps = list(self.steps)
+        steps[index] = Step(DONE, None, None, None, None, None)
+        plan.steps = tuple(steps)
+        return plan
+
+    def iter_stats(self):
+        """
+        Iterate over the stats for every action step, including steps in nested IoBound plans
+        """
+        for index, step in enumerate(self.steps):
+            if step.stats is not None:
+                yield step.stats
+            elif step.op == CONCURRENT:
+                for stats in self.concurrent[index].iter_stats():
+                    yield stats
+
+    def _compile_block(self, actions, terminal):
+        start = len(self.steps)
+        branches = []
+
+        for action in actions:
+            index = len(self.steps)
+            if isinstance(action, list):
+                branches.append((index, action))
+                self.steps.append([BRANCH, None, index + 1, None, None, None])
+            elif isinstance(action, IoBound):
+                self.concurrent[index] = self._compile_concurrent(action)
+                self.steps.append([CONCURRENT, action, index + 1, None, None, None])
+            else:
+                stats = ActionStats(action_name(action)) if self._stats and not isinstance(action, Stage) else None
+                invoke = invoker(action) if callable(action) else None
+                self.steps.append([ACTION, action, index + 1, batch_method(action), stats, invoke])
+
+        self.steps.append([terminal, None, None, None, None, None])
+
+        for index, branch in branches:
+            self.steps[index][1] = self._compile_block(branch, END)
+
+        first = None
+        for position, (index, _) in enumerate(branches):
+            if first is None:
+                first = index
+            if position + 1 == len(branches) or branches[position + 1][0] != index + 1:
+                if index > first:
+                    self.siblings[first] = (tuple(self.steps[i][1] for i in range(first, index + 1)), index + 1)
+                first = None
+
+        return start
+
+    def _compile_concurrent(self, concurrent):
+        plan = ExecutionPlan(concurrent.actions, stats=self._stats)
+        if concurrent.adaptive is not None:
+            # Report the current limit with the stats of the wrapped actions
+            for stats in plan.iter_stats():
+                stats.limiter = concurrent.adaptive
+        return plan
@@ -1,10 +1,12 @@
 import six
 import logging
 import json
+import hashlib
+import threading
 
-from chomper.items import Item, Selector
-from chomper.exceptions import ImporterMethodNotFound, DropField, DropItem
-from chomper.utils import smart_invoke, type_name, iter_methods
+from chomper.items import Item, Field, Selector
+from chomper.exceptions import ImporterMethodNotFound, DropField, DropItem, ItemNotImportable
+from chomper.utils import smart_invoke, type_name, iter_methods, path_get
 
 
 ITEM_TYPE = 'item'
@@ -85,6 +87,27 @@ class Processor(object):
         item = self.process(item)
         return self.after_process(item)
 
+    def process_batch(self, items, importer=None):
+        """
+        Process a list of items, leaving out any items that were dropped
+
+        The items are still processed one at a time, so batching gives processors no speedup on
+        its own. Subclasses can override this to work on the whole list at once.
+        """
+        processed = []
+        for item in items:
+            try:
+                item = self(item, importer)
+            except DropItem:
+                continue
+            except ItemNotImportable as e:
+                # Only this item is left out, as when processing items one at a time
+                self.logger.error(str(e))
+                continue
+            if item is not None:
+                processed.append(item)
+        return processed
+
     @property
     def logger(self):
         return logging.getLogger(type(self).__name__)
@@ -113,7 +136,8 @@ class Processor(object):
     def _run_field_processors(self, item):
         for field in self.selector.iterfields():
             key = field.get_key()
-            value = field.get_value(item)
+            # Processors may change dict and list values in place, so shared values are copied first
+            value = item.writable(field)
             key_changed = False
 
             try:
@@ -330,7 +354,7 @@ class Picker(Processor):
 
     @item_processor()
     def pick_item_fields(self, item):
-        _item = Item()
+        _item = item.fork(dict())
         for field in self.fields:
             if field in item:
                 _item[field] = item[field]
@@ -356,6 +380,84 @@ class Omitter(Processor):
         return item
 
 
+class UnchangedSkipper(Processor):
+    """
+    Drop items that have not changed since they were last exported
+
+    A fingerprint (hash) of the item's "fields" (or all of its fields) is saved for each
+    identifier (the values of the "key" fields) to a SQLite database at "path", or the importer's
+    "fingerprint_path". Items with the same fingerprint as last time are dropped. A new
+    fingerprint is only saved once its item has made it to the end of the pipeline, so items
+    dropped or rejected by later actions are checked again the next time. The key fields should
+    still be on the item when it reaches the end, otherwise it is never skipped.
+    """
+
+    def __init__(self, selector, key, fields=None, path=None, **kwargs):
+        super(UnchangedSkipper, self).__init__(selector, **kwargs)
+        self.key = self._get_paths(key)
+        self.fields = self._get_paths(fields) if fields is not None else None
+        self.path = path
+        self._store = None
+        self._lock = threading.Lock()
+
+    @item_processor()
+    def skip_unchanged_item(self, item):
+        if not self._get_store().changed(self.get_key(item), self.fingerprint(item)):
+            raise DropItem()
+        return item
+
+    def get_key(self, item):
+        return json.dumps([path_get(path, item) for path in self.key], sort_keys=True, default=str)
+
+    def fingerprint(self, item):
+        values = item if self.fields is None else [path_get(path, item) for path in self.fields]
+        data = json.dumps(values, sort_keys=True, default=str)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def open(self):
+        # Worker processes are forked with a copy of the store, they open their own connection
+        self._store = None
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def item_exported(self, item):
+        """
+        Keep the new fingerprint of an item that made it to the end of the pipeline
+        """
+        if self._store is not None:
+            self._store.exported(self.get_key(item))
+
+    def items_exported(self):
+        """
+        Save the fingerprints of the exported items, called by the importer once every item seen
+        so far has finished
+        """
+        if self._store is not None:
+            self._store.commit(finished=True)
+
+    def _get_store(self):
+        from chomper.support.fingerprints import FingerprintStore
+
+        with self._lock:
+            if self._store is None:
+                path = self.path or getattr(self.importer, 'fingerprint_path', None)
+                if not path:
+                    raise ValueError('Set a path for the fingerprints of "%s" or the importer\'s "fingerprint_path"'
+                                     % self.name)
+                scope = self.importer.name if self.importer is not None else ''
+                self._store = FingerprintStore(path, scope)
+            return self._store
+
+    @staticmethod
+    def _get_paths(fields):
+        if not isinstance(fields, (list, tuple)):
+            fields = [fields]
+        return [field.get_path() if isinstance(field, Field) else field for field in fields]
+
+
 class Logger(Processor):
 
     def __init__(self, selector, level=logging.DEBUG, **kwargs):
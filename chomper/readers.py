@@ -1,5 +1,11 @@
+import os
+import time
+import locale
+import hashlib
 import logging
 
+import six
+
 try:
     from urllib.parse import urlparse
 except ImportError:
@@ -32,9 +38,43 @@ class Reader(object):
 
     schemes = None
 
+    # Position after the data read so far, for readers that can resume from it (see "seek")
+    position = None
+
     def read(self):
         raise NotImplementedError()
 
+    def seek(self, position):
+        """
+        Start the next read from a position saved from an earlier read
+        """
+        raise NotImplementedError('%s can not resume from a position' % type(self).__name__)
+
+    def fingerprint(self, contents=False):
+        """
+        Get a JSON serialisable value that changes whenever the resource does, or None if the
+        reader can not tell
+
+        With "contents" a hash of the data is used where the reader can get one, for resources
+        that are written again with the same data.
+        """
+        return None
+
+    def wait(self, timeout):
+        """
+        Block until the resource may have new data to read, or the timeout (in seconds) is reached
+
+        Returns True if new data is available. Readers that cannot tell just sleep.
+        """
+        time.sleep(timeout)
+        return False
+
+    def at_start(self):
+        """
+        Check if the next read will start from the beginning of the resource
+        """
+        return True
+
     @property
     def logger(self):
         return logging.getLogger(__name__)
@@ -50,23 +90,123 @@ class Reader(object):
 
 
 class FileReader(Reader):
+    """
+    Read a local file
+
+    In follow mode the file is kept open between reads, so each read only returns the lines that
+    were appended since the last one.
+
+    When reading lines (without following), "position" is the byte offset after the last line
+    read, and "seek" starts the next read from such an offset.
+    """
 
     schemes = ['file']
 
-    def __init__(self, resource, lines=True):
+    # How often to check a followed file for new data while waiting
+    poll_interval = 0.05
+
+    def __init__(self, resource, lines=True, follow=False, encoding=None):
         self.resource = resource
         self.lines = lines
+        self.follow = follow
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.position = 0 if lines and not follow else None
+        self._start = 0
+        self._file = None
+        self._partial = ''
+        self._size = 0
 
     def read(self):
-        with open(self.resource.uri, 'r') as f:
-            if self.lines:
-                for line in f:
-                    if line and line.strip():
-                        yield line.strip()
-                    else:
-                        continue
-            else:
+        if self.follow:
+            for line in self._read_appended():
+                yield line
+            return
+
+        if not self.lines:
+            with open(self.resource.uri, 'r') as f:
                 yield f.read()
+            return
+
+        # Lines are read as bytes, so the offset after each line is known
+        start, self._start = self._start, 0
+        with open(self.resource.uri, 'rb') as f:
+            f.seek(start)
+            self.position = start
+            for line in f:
+                self.position += len(line)
+                line = line.strip()
+                if line:
+                    yield line.decode(self.encoding) if six.PY3 else line
+
+    def seek(self, position):
+        if self.follow or not self.lines:
+            return super(FileReader, self).seek(position)
+        self._start = position
+
+    def fingerprint(self, contents=False):
+        if self.follow:
+            # Followed files are read from where the last read stopped
+            return None
+        try:
+            stat = os.stat(self.resource.uri)
+        except OSError:
+            return None
+
+        if not contents:
+            return dict(size=stat.st_size, mtime=stat.st_mtime)
+
+        sha1 = hashlib.sha1()
+        with open(self.resource.uri, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                sha1.update(block)
+        return dict(size=stat.st_size, sha1=sha1.hexdigest())
+
+    def wait(self, timeout):
+        if not self.follow:
+            return super(FileReader, self).wait(timeout)
+
+        end = time.time() + timeout
+        while True:
+            if self._get_size() != self._size:
+                return True
+            remaining = end - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.poll_interval, remaining))
+
+    def at_start(self):
+        return self._file is None and not self._start
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_appended(self):
+        if self._file is None:
+            self._file = open(self.resource.uri, 'r')
+
+        self._size = self._get_size()
+
+        while True:
+            line = self._file.readline()
+            if not line:
+                break
+            elif not line.endswith('\n'):
+                # Keep incomplete lines until the rest of the line is written
+                self._partial += line
+                break
+
+            line = (self._partial + line).strip()
+            self._partial = ''
+            if line:
+                yield line
+
+    def _get_size(self):
+        try:
+            return os.path.getsize(self.resource.uri)
+        except OSError:
+            return 0
 
 
 class HttpReader(Reader):
@@ -82,6 +222,9 @@ class HttpReader(Reader):
         self.method = method.lower()
         self.request_args = request_args
 
+        # Stream the response body, so lines can be fed before the whole response is downloaded
+        self.request_args.setdefault('stream', lines)
+
     def read(self):
         response = requests.request(self.method, self.resource.uri, **self.request_args)
 
@@ -98,6 +241,21 @@ class HttpReader(Reader):
         else:
             yield response.text
 
+    def fingerprint(self, contents=False):
+        """
+        Get the ETag and Last-Modified headers from a HEAD request, the contents are not hashed
+        """
+        if self.method != 'get':
+            return None
+
+        request_args = dict((key, value) for key, value in six.iteritems(self.request_args) if key != 'stream')
+        response = requests.head(self.resource.uri, allow_redirects=True, **request_args)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not response.ok or (etag is None and last_modified is None):
+            return None
+        return dict(etag=etag, last_modified=last_modified)
+
 
 class S3Reader(Reader):
 
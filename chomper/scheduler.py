@@ -0,0 +1,315 @@
+"""
+Run many importers in one process on intervals or cron schedules
+"""
+import time
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer as timer
+
+import six
+
+
+logger = logging.getLogger(__name__)
+
+
+class Schedule(object):
+    """
+    Base class for schedules, which work out the next time (as a unix timestamp) an importer is due
+    """
+
+    def first_run(self, now):
+        return self.next_run(now)
+
+    def next_run(self, after):
+        raise NotImplementedError()
+
+
+class Interval(Schedule):
+    """
+    Run every "seconds" seconds, starting "delay" seconds after the importer is added
+
+    Runs that would have started while the previous run was still going are skipped.
+    """
+
+    def __init__(self, seconds, delay=0):
+        if seconds <= 0:
+            raise ValueError('Interval must be a positive number of seconds')
+        self.seconds = seconds
+        self.delay = delay
+
+    def first_run(self, now):
+        return now + self.delay
+
+    def next_run(self, after):
+        return after + self.seconds
+
+    def __repr__(self):
+        return 'Interval(%s)' % self.seconds
+
+
+class Cron(Schedule):
+    """
+    Run at the times matching a cron expression, in local time
+
+    Expressions have five fields: minute, hour, day of month, month and day of week (0 or 7 is
+    Sunday). Each field is "*", a number, a range "1-5", a list "1,15,30" or any of these with a
+    step such as "*/15" or "0-30/10". As in cron, when both the day of month and day of week are
+    restricted a day matching either of them will do.
+    """
+
+    FIELDS = [('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7)]
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != len(self.FIELDS):
+            raise ValueError('Cron expression "%s" must have %d fields' % (expression, len(self.FIELDS)))
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = [
+            self._parse_field(part, low, high) for part, (name, low, high) in zip(parts, self.FIELDS)]
+        self.weekdays = set(day % 7 for day in weekdays)
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    def next_run(self, after):
+        moment = datetime.datetime.fromtimestamp(after).replace(second=0, microsecond=0)
+        moment += datetime.timedelta(minutes=1)
+
+        # Jump ahead by the largest field that does not match, there is always a match within a few years
+        limit = moment + datetime.timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return time.mktime(moment.timetuple())
+
+        raise ValueError('Cron expression "%s" never matches' % self.expression)
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        # Python weeks start on Monday (0), cron weeks start on Sunday (0)
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def _parse_field(self, field, low, high):
+        values = set()
+        for part in field.split(','):
+            part, _, step = part.partition('/')
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = [int(value) for value in part.split('-', 1)]
+            else:
+                start = end = int(part)
+                if step:
+                    end = high
+
+            if start < low or end > high or start > end:
+                raise ValueError('Cron field "%s" is out of range %d-%d' % (field, low, high))
+
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def __repr__(self):
+        return 'Cron(%r)' % self.expression
+
+
+def make_schedule(schedule):
+    """
+    Get a schedule from a number of seconds, a cron expression or a Schedule
+    """
+    if isinstance(schedule, Schedule):
+        return schedule
+    elif isinstance(schedule, six.string_types):
+        return Cron(schedule)
+    elif isinstance(schedule, datetime.timedelta):
+        return Interval(schedule.total_seconds())
+    elif isinstance(schedule, six.integer_types + (float, )):
+        return Interval(schedule)
+    raise ValueError('Schedule must be a number of seconds, a cron expression or a Schedule, got %r' % schedule)
+
+
+class Job(object):
+    """
+    An importer added to a scheduler, along with the counters for its runs
+
+    The importer instance is created on the first run and reused for later runs, so actions are
+    opened again before each run instead of being created again.
+    """
+
+    def __init__(self, importer_cls, schedule, name=None, options=None):
+        self.importer_cls = importer_cls
+        self.schedule = schedule
+        self.name = name or importer_cls.name or importer_cls.__name__
+        self.options = options or dict()
+        self.importer = None
+        self.next_time = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = None
+        self.last_error = None
+
+    def run(self):
+        start = timer()
+        try:
+            if self.importer is None:
+                self.importer = self.importer_cls(**self.options)
+            else:
+                # Actions were closed at the end of the last run
+                self.importer.open()
+            self.importer.run()
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = repr(e)
+            logger.exception('Importer %s failed' % self.name)
+        finally:
+            self.runs += 1
+            self.last_duration = timer() - start
+
+    def stats(self):
+        return dict(
+            name=self.name,
+            schedule=repr(self.schedule),
+            running=self.running,
+            next_run=self.next_time,
+            runs=self.runs,
+            failures=self.failures,
+            last_duration=self.last_duration,
+            last_error=self.last_error,
+            importer=self.importer.stats() if self.importer is not None else None
+        )
+
+
+class Scheduler(object):
+    """
+    Run importers on intervals or cron schedules, on a pool of threads in the current process
+
+    Importers run in the same process share its parsed config, imported modules and Redis
+    connection pools, instead of setting them up in a separate process for each importer. At most
+    "max_concurrent" importers run at once, importers that are due while the limit is reached start
+    as soon as another one finishes. An importer is never run twice at the same time, a run that
+    is due while the last one is still going is skipped. Long running importers would never
+    finish, so each run only runs the pipeline once unless "close_when_idle" is set in the
+    importer's options.
+    """
+
+    def __init__(self, max_concurrent=4):
+        self.max_concurrent = max_concurrent
+        self.jobs = []
+        self._executor = None
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+
+    def add(self, importer_cls, schedule, name=None, **options):
+        """
+        Add an importer class to be run on a schedule
+
+        :param importer_cls: Importer subclass
+        :param schedule: Seconds between runs, a cron expression or a Schedule
+        :param name: Name for logs and stats, defaults to the importer name
+        :param options: Attributes to set on the importer, as given to the importer's constructor
+        """
+        options.setdefault('close_when_idle', True)
+        job = Job(importer_cls, make_schedule(schedule), name, options)
+        job.next_time = job.schedule.first_run(time.time())
+        with self._condition:
+            self.jobs.append(job)
+            self._condition.notify_all()
+        return job
+
+    def run(self):
+        """
+        Run importers as they are due until "stop" is called, then wait for running importers to finish
+        """
+        self._stopped.clear()
+        try:
+            while not self._stopped.is_set():
+                self.run_pending()
+                with self._condition:
+                    if not self._stopped.is_set():
+                        self._condition.wait(self._time_until_due())
+        finally:
+            self.close()
+
+    def run_pending(self):
+        """
+        Start the importers that are due, up to the concurrency limit, and return their jobs
+        """
+        started = []
+        now = time.time()
+        with self._condition:
+            for job in sorted(self.jobs, key=lambda job: job.next_time):
+                if job.next_time > now:
+                    break
+                if job.running:
+                    logger.debug('Skipping %s, the last run has not finished' % job.name)
+                    job.next_time = self._next_time(job, now)
+                    continue
+                if self._running_count() >= self.max_concurrent:
+                    break
+                job.running = True
+                job.next_time = self._next_time(job, now)
+                started.append(job)
+
+        if started and self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_concurrent)
+
+        for job in started:
+            logger.info('Running %s' % job.name)
+            self._executor.submit(self._run_job, job)
+        return started
+
+    def stop(self):
+        with self._condition:
+            self._stopped.set()
+            self._condition.notify_all()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def stats(self):
+        with self._condition:
+            return [job.stats() for job in self.jobs]
+
+    def _run_job(self, job):
+        try:
+            job.run()
+        finally:
+            with self._condition:
+                job.running = False
+                job.next_time = self._next_time(job, time.time())
+                self._condition.notify_all()
+
+    def _running_count(self):
+        return sum(1 for job in self.jobs if job.running)
+
+    def _time_until_due(self):
+        waiting = [job.next_time for job in self.jobs if not job.running]
+        if not waiting or self._running_count() >= self.max_concurrent:
+            # Woken up when a job finishes or is added
+            return None
+        return max(min(waiting) - time.time(), 0)
+
+    @staticmethod
+    def _next_time(job, now):
+        if job.next_time > now:
+            return job.next_time
+        next_time = job.schedule.next_run(job.next_time)
+        if next_time <= now:
+            # Missed runs (while the importer was still running or waiting for a thread) are skipped
+            next_time = job.schedule.next_run(now)
+        return next_time
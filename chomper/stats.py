@@ -0,0 +1,122 @@
+import six
+import math
+import threading
+from timeit import default_timer as timer
+
+
+# Call durations are counted in log scaled buckets (20 per decade, starting at 1 microsecond)
+BUCKETS_PER_DECADE = 20
+MIN_DURATION = 1e-6
+PERCENTILES = (50, 90, 99)
+
+
+def action_name(action):
+    """
+    Get a readable name for a pipeline action
+    """
+    name = getattr(action, 'name', None)
+    if name and isinstance(name, six.string_types):
+        return name
+    return getattr(action, '__name__', None) or type(action).__name__
+
+
+class ActionStats(object):
+    """
+    Counters and call durations for a single pipeline action
+
+    Durations are kept in a histogram rather than as a list of samples, so stats from several
+    processes can be merged and the percentiles stay accurate to within a bucket (about 12%).
+    """
+
+    COUNTERS = ('calls', 'items_in', 'items_out', 'items_dropped', 'exceptions')
+
+    def __init__(self, name):
+        self.name = name
+        # Adaptive concurrency limit the action runs under, if any (see AdaptiveLimit)
+        self.limiter = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.items_dropped = 0
+        self.exceptions = 0
+        self.time = 0.0
+        self.histogram = {}
+
+    def record(self, duration, items_in=1, items_out=0, dropped=0, exceptions=0):
+        bucket = int(math.log10(max(duration, MIN_DURATION) / MIN_DURATION) * BUCKETS_PER_DECADE)
+        with self._lock:
+            self.calls += 1
+            self.items_in += items_in
+            self.items_out += items_out
+            self.items_dropped += dropped
+            self.exceptions += exceptions
+            self.time += duration
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def iter_timed(self, results, duration):
+        """
+        Wrap the generator returned by an action, so the time spent creating each item is counted
+        """
+        self.record(duration)
+        while True:
+            start = timer()
+            try:
+                result = next(results)
+            except StopIteration:
+                self.record_generated(timer() - start)
+                return
+            except Exception:
+                self.record_generated(timer() - start, exceptions=1)
+                raise
+            self.record_generated(timer() - start, items_out=1)
+            yield result
+
+    def record_generated(self, duration, items_out=0, exceptions=0):
+        """
+        Count the time spent creating items after the action returned a generator
+        """
+        with self._lock:
+            self.time += duration
+            self.items_out += items_out
+            self.exceptions += exceptions
+
+    def percentile(self, percent):
+        if not self.calls:
+            return None
+        target = self.calls * percent / 100.0
+        count = 0
+        for bucket in sorted(self.histogram):
+            count += self.histogram[bucket]
+            if count >= target:
+                # Upper bound of the bucket
+                return MIN_DURATION * math.pow(10, float(bucket + 1) / BUCKETS_PER_DECADE)
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            data = dict((key, getattr(self, key)) for key in self.COUNTERS)
+            data['time'] = self.time
+            data['histogram'] = dict(self.histogram)
+            if reset:
+                self.reset()
+        return data
+
+    def merge(self, snapshot):
+        with self._lock:
+            for key in self.COUNTERS:
+                setattr(self, key, getattr(self, key) + snapshot[key])
+            self.time += snapshot['time']
+            for bucket, count in snapshot['histogram'].items():
+                self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+
+    def as_dict(self):
+        data = self.snapshot()
+        del data['histogram']
+        data['name'] = self.name
+        data['limit'] = self.limiter.limit if self.limiter is not None else None
+        for percent in PERCENTILES:
+            data['p%d' % percent] = self.percentile(percent)
+        return data
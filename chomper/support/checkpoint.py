@@ -0,0 +1,55 @@
+import os
+import json
+import tempfile
+import threading
+
+# Replaces an existing file on Windows too (Python 3)
+_replace = getattr(os, 'replace', os.rename)
+
+
+class CheckpointStore(object):
+    """
+    Positions of resumable feeders (or fingerprints of their inputs) by name, saved to a JSON file
+
+    The file is replaced in one step on each save, so a crash never leaves a half written
+    checkpoint behind. Values must be JSON serialisable (e.g. offsets, line numbers or keys).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def get(self, name, default=None):
+        return self._load().get(name, default)
+
+    def save(self, name, position):
+        with self._lock:
+            checkpoints = self._load()
+            checkpoints[name] = position
+            self._write(checkpoints)
+
+    def delete(self, name):
+        with self._lock:
+            checkpoints = self._load()
+            if checkpoints.pop(name, None) is not None:
+                self._write(checkpoints)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError):
+            return dict()
+
+    def _write(self, checkpoints):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.chomper-checkpoint-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(checkpoints, f)
+                f.flush()
+                os.fsync(f.fileno())
+            _replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
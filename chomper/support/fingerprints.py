@@ -0,0 +1,87 @@
+import sqlite3
+import threading
+
+
+class FingerprintStore(object):
+    """
+    Fingerprints of the items last exported, by identifier, kept in a SQLite database
+
+    A changed item's new fingerprint is held in memory until the item is marked as "exported",
+    and only saved after that (every "commit_size" exported items, or on "commit"). Items that
+    were never exported (dropped by a later action, rejected by the exporter or left over when
+    the run failed) are seen as changed the next time. Several importers can share a database,
+    each one only sees the fingerprints saved under its own "scope".
+    """
+
+    commit_size = 1000
+
+    def __init__(self, path, scope=''):
+        self.path = path
+        self.scope = scope
+        self._pending = dict()
+        self._exported = dict()
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def changed(self, key, fingerprint):
+        """
+        Check whether an item's fingerprint differs from the one saved for its key, and if so
+        remember the new one until the item is exported
+        """
+        with self._lock:
+            row = self._connect().execute('SELECT fingerprint FROM fingerprints WHERE scope = ? AND key = ?',
+                                          (self.scope, key)).fetchone()
+            if row is not None and row[0] == fingerprint:
+                return False
+            self._pending[key] = fingerprint
+            return True
+
+    def exported(self, key):
+        """
+        Mark the item with a key as exported, so its new fingerprint is saved
+        """
+        with self._lock:
+            fingerprint = self._pending.pop(key, None)
+            if fingerprint is not None:
+                self._exported[key] = fingerprint
+            if len(self._exported) >= self.commit_size:
+                self._write()
+
+    def commit(self, finished=False):
+        """
+        Save the fingerprints of the exported items
+
+        When "finished", every item checked so far is done with, so the fingerprints of items
+        that were not exported are forgotten.
+        """
+        with self._lock:
+            self._write()
+            if finished:
+                self._pending.clear()
+
+    def close(self):
+        with self._lock:
+            # Fingerprints that were never committed are forgotten
+            self._pending.clear()
+            self._exported.clear()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _write(self):
+        if not self._exported:
+            return
+        connection = self._connect()
+        connection.executemany('INSERT OR REPLACE INTO fingerprints (scope, key, fingerprint) VALUES (?, ?, ?)',
+                               [(self.scope, key, value) for key, value in self._exported.items()])
+        connection.commit()
+        self._exported.clear()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS fingerprints ('
+                                     'scope TEXT, key TEXT, fingerprint TEXT, PRIMARY KEY (scope, key))')
+            self._connection.commit()
+        return self._connection
@@ -0,0 +1,126 @@
+import sys
+import tempfile
+import threading
+from collections import deque
+
+import six
+from six.moves import cPickle as pickle
+
+
+def estimate_size(obj):
+    """
+    Roughly estimate the memory used by an object, including the containers and values within it
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in six.iteritems(obj):
+            size += sys.getsizeof(key) + estimate_size(value)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for value in obj:
+            size += estimate_size(value)
+    return size
+
+
+class SpillBuffer(object):
+    """
+    First in, first out buffer that moves items to a temporary file once it is over budget
+
+    Items are kept in memory while there are fewer than "max_items" and their estimated size is
+    within "budget" bytes. Items added after that are pickled to the file, and so are all items
+    added while the file still has unread items, so items are always read back in the order they
+    were added. One thread may add items while another takes them.
+
+    :param budget: Max estimated bytes of items kept in memory (None for no limit)
+    :param max_items: Max number of items kept in memory (None for no limit)
+    :param directory: Directory for the temporary file, defaults to the system temp directory
+    """
+
+    def __init__(self, budget=None, max_items=None, directory=None):
+        self.budget = budget
+        self.max_items = max_items
+        self.directory = directory
+        self.spilled_items = 0
+        self.spilled_bytes = 0
+        self._memory = deque()
+        self._memory_size = 0
+        self._file = None
+        self._read_position = 0
+        self._write_position = 0
+        self._on_disk = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._memory) + self._on_disk
+
+    def append(self, item):
+        size = estimate_size(item) if self.budget is not None else 0
+        with self._lock:
+            if self._on_disk or self._memory and self._over_budget(size):
+                self._spill(item)
+            else:
+                self._memory.append((item, size))
+                self._memory_size += size
+
+    def popleft(self):
+        with self._lock:
+            if self._memory:
+                item, size = self._memory.popleft()
+                self._memory_size -= size
+                return item
+            elif self._on_disk:
+                return self._unspill()
+        raise IndexError('pop from an empty buffer')
+
+    def take(self, count):
+        """
+        Remove and return a list of (at most) the first "count" items
+        """
+        items = []
+        while len(items) < count and len(self):
+            items.append(self.popleft())
+        return items
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._reset_file()
+
+    def close(self):
+        self.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _over_budget(self, size):
+        if self.max_items is not None and len(self._memory) >= self.max_items:
+            return True
+        return self.budget is not None and self._memory_size + size > self.budget
+
+    def _spill(self, item):
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix='chomper-spill-', dir=self.directory)
+        self._file.seek(self._write_position)
+        pickle.dump(item, self._file, pickle.HIGHEST_PROTOCOL)
+        position = self._file.tell()
+        self.spilled_items += 1
+        self.spilled_bytes += position - self._write_position
+        self._write_position = position
+        self._on_disk += 1
+
+    def _unspill(self):
+        self._file.seek(self._read_position)
+        item = pickle.load(self._file)
+        self._read_position = self._file.tell()
+        self._on_disk -= 1
+        if not self._on_disk:
+            # Everything on disk has been read, so the file can be reused from the start
+            self._reset_file()
+        return item
+
+    def _reset_file(self):
+        if self._file is not None:
+            self._file.seek(0)
+            self._file.truncate()
+        self._read_position = self._write_position = 0
+        self._on_disk = 0
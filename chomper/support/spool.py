@@ -0,0 +1,178 @@
+import sys
+import sqlite3
+import threading
+from timeit import default_timer as timer
+
+import six
+from six.moves import cPickle as pickle
+
+
+class SpoolQueue(object):
+    """
+    Durable queue between two pipeline stages, kept in a SQLite database
+
+    The stage before the spool writes items to the database in transactions of up to
+    "batch_size" items (or whatever arrived within "flush_interval" seconds). The stage after it
+    reads them back in batches of "batch_size" items and acknowledges each batch once it has run,
+    which deletes it. Items still in the database when the importer stops (or crashes) are run
+    again the next time it starts, so the stages after a spool should be safe to repeat.
+    """
+
+    # Seconds between checks for new items while the spool is empty
+    poll_interval = 0.1
+
+    def __init__(self, path, name, batch_size=500, max_retries=5, retry_delay=1.0, flush_interval=1.0):
+        self.path = path
+        self.name = name
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.flush_interval = flush_interval
+        self.items = 0
+        self.drained = 0
+        self.batches = 0
+        self.retries = 0
+        self.max_depth = 0
+        self.put_stall = 0.0
+        self.get_stall = 0.0
+        self._depth = 0
+        self._reader = None
+        self._ready = threading.Condition()
+        self._fed = threading.Event()
+        self._closed = threading.Event()
+        self._error = None
+
+    def stats(self):
+        """
+        Get the number of items waiting in the spool and the number written to and drained from it
+
+        "put_stall" is the time spent writing items to the database, "get_stall" is the time the
+        stage after the spool spent waiting for items.
+        """
+        return dict(
+            name=self.name,
+            path=self.path,
+            size=self.batch_size,
+            depth=self._depth,
+            max_depth=self.max_depth,
+            items=self.items,
+            drained=self.drained,
+            batches=self.batches,
+            retries=self.retries,
+            put_stall=self.put_stall,
+            get_stall=self.get_stall,
+            spilled_items=0,
+            spilled_bytes=0
+        )
+
+    def open(self):
+        connection = self._connect()
+        try:
+            connection.execute('CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY AUTOINCREMENT, data BLOB)')
+            connection.commit()
+            # Items left over from an earlier run are drained first
+            self._depth = self.max_depth = connection.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+        finally:
+            connection.close()
+        self._fed.clear()
+        self._closed.clear()
+        self._error = None
+
+    def close(self):
+        self._closed.set()
+        with self._ready:
+            self._ready.notify_all()
+
+    def feed(self, items):
+        """
+        Write items to the spool, keeping the exception if one stops the items
+        """
+        connection = self._connect()
+        rows = []
+        flushed = timer()
+        try:
+            try:
+                for item in items:
+                    if self._closed.is_set():
+                        break
+                    rows.append((sqlite3.Binary(pickle.dumps(item, pickle.HIGHEST_PROTOCOL)), ))
+                    if len(rows) >= self.batch_size or timer() - flushed > self.flush_interval:
+                        self._write(connection, rows)
+                        rows, flushed = [], timer()
+            finally:
+                # Items fed before an exception are kept
+                self._write(connection, rows)
+        except BaseException:
+            self._error = sys.exc_info()
+        finally:
+            connection.close()
+            self._fed.set()
+            with self._ready:
+                self._ready.notify_all()
+
+    def __iter__(self):
+        """
+        Iterate over batches of items as lists of (id, pickled item) rows, see "load" and "ack"
+
+        Stops once the stage before the spool has finished and every item has been read.
+        """
+        self._reader = self._connect()
+        last_id = 0
+        try:
+            while not self._closed.is_set():
+                start = timer()
+                fed = self._fed.is_set()
+                rows = self._reader.execute('SELECT id, data FROM items WHERE id > ? ORDER BY id LIMIT ?',
+                                            (last_id, self.batch_size)).fetchall()
+                if rows:
+                    self.get_stall += timer() - start
+                    last_id = rows[-1][0]
+                    yield rows
+                elif fed:
+                    if self._error is not None:
+                        six.reraise(*self._error)
+                    return
+                else:
+                    with self._ready:
+                        self._ready.wait(self.poll_interval)
+                    self.get_stall += timer() - start
+        finally:
+            self._reader.close()
+            self._reader = None
+
+    @staticmethod
+    def load(rows):
+        """
+        Get fresh copies of the items in a batch
+        """
+        return [pickle.loads(bytes(data)) for _, data in rows]
+
+    def ack(self, rows):
+        """
+        Delete a batch that has run through the rest of the pipeline
+        """
+        self._reader.execute('DELETE FROM items WHERE id >= ? AND id <= ?', (rows[0][0], rows[-1][0]))
+        self._reader.commit()
+        with self._ready:
+            self._depth -= len(rows)
+            self.drained += len(rows)
+            self.batches += 1
+
+    def _write(self, connection, rows):
+        if not rows:
+            return
+        start = timer()
+        connection.executemany('INSERT INTO items (data) VALUES (?)', rows)
+        connection.commit()
+        self.put_stall += timer() - start
+        with self._ready:
+            self.items += len(rows)
+            self._depth += len(rows)
+            self.max_depth = max(self.max_depth, self._depth)
+            self._ready.notify_all()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        # Lets the drain read while the feeder writes
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
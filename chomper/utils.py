@@ -1,6 +1,18 @@
 import inspect
 import re
 import six
+import types
+from itertools import islice
+
+
+try:
+    _getargspec = inspect.getfullargspec
+except AttributeError:
+    # Python 2
+    _getargspec = inspect.getargspec
+
+# Number of arguments accepted by each code object, shared by every function created from it
+_arity_cache = {}
 
 
 TYPE_NAME_MAP = {
@@ -29,35 +41,85 @@ class AttrDict(dict):
         super(AttrDict, self).__init__(*args, **kwargs)
         self.__dict__ = self
 
+    def __reduce__(self):
+        # Rebuild through __init__ when unpickled, otherwise the instance dict would be a separate copy
+        return type(self), (dict(self),)
+
 
 def iter_methods(cls):
     for name, method in inspect.getmembers(cls, predicate=lambda m: inspect.ismethod(m) or inspect.isfunction(m)):
         yield name, method
 
 
-def smart_invoke(func, args=None):
+def get_arity(func):
     """
-    Invoke the provided function / callable with the correct number of arguments
+    Get the number of positional arguments a function / callable accepts (not counting self / cls)
+
+    Functions, methods and callable objects are looked up by their code object, so each one is
+    only inspected once.
     """
-    if args is None:
-        args = []
+    code = getattr(func, '__code__', None)
+    if not isinstance(code, types.CodeType) and not inspect.isroutine(func) and hasattr(func, '__call__'):
+        code = getattr(func.__call__, '__code__', None)
 
-    if not (isinstance(args, list) or isinstance(args, tuple)):
-        args = [args]
+    if isinstance(code, types.CodeType):
+        try:
+            return _arity_cache[code]
+        except KeyError:
+            args = code.co_varnames[:code.co_argcount]
+            arity = _arity_cache[code] = len([arg for arg in args if arg not in ['self', 'cls']])
+            return arity
 
     try:
-        spec = inspect.getargspec(func)
+        spec = _getargspec(func)
     except TypeError:
-        # inspect.getargspec does not support callable objects by default
+        # Callables that are not functions (e.g. partials on older versions) are not supported
         if hasattr(func, '__call__'):
-            spec = inspect.getargspec(func.__call__)
+            spec = _getargspec(func.__call__)
         else:
             raise
 
     # Remove the "self" / "cls" arg from the spec
-    spec_args = [arg for arg in spec.args if arg not in ['self', 'cls']]
+    return len([arg for arg in spec.args if arg not in ['self', 'cls']])
+
+
+def invoker(func):
+    """
+    Create a function that invokes func with the correct number of arguments from a list of args
+
+    The number of arguments is resolved once, so the returned function is cheap to call repeatedly.
+    """
+    arity = get_arity(func)
 
-    return func(*args[:len(spec_args)])
+    def invoke(args):
+        return func(*args[:arity])
+
+    return invoke
+
+
+def smart_invoke(func, args=None):
+    """
+    Invoke the provided function / callable with the correct number of arguments
+    """
+    if args is None:
+        args = []
+
+    if not (isinstance(args, list) or isinstance(args, tuple)):
+        args = [args]
+
+    return func(*args[:get_arity(func)])
+
+
+def chunked(iterable, size):
+    """
+    Lazily split an iterable into lists of (at most) the provided size
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 def type_name(_type):
@@ -6,13 +6,13 @@ from chomper.feeders import ListFeeder
 logging.basicConfig(level=logging.DEBUG)
 
 
-def log_item(item, meta, importer):
+def log_item(item, importer):
     importer.logger.info('= %s' % item['title'])
     return item
 
 
 def log(message):
-    def func(item, meta, importer):
+    def func(item, importer):
         importer.logger.info(message)
         return item
     return func
@@ -4,7 +4,7 @@ from setuptools import setup, find_packages
 setup(
     name='chomper',
     version='0.0.1',
-    packages=find_packages(exclude=('tests', 'tests.*')),
+    packages=find_packages(exclude=('tests', 'tests.*', 'benchmarks', 'benchmarks.*')),
     url='',
     license='MIT',
     author='Sam Milledge',
@@ -13,6 +13,12 @@ setup(
     install_requires=[
         'six>=1.10.0',
         'configparser>=3.5.0',
-        'pytz>=2016.10'
-    ]
+        'pytz>=2016.10',
+        'futures>=3.0.5; python_version < "3"'
+    ],
+    entry_points={
+        'console_scripts': [
+            'chomper = chomper.cli:main'
+        ]
+    }
 )
@@ -1,4 +1,5 @@
 import os
+import sys
 import logging
 
 from orator import DatabaseManager
@@ -8,6 +9,9 @@ from chomper import config
 
 logging.basicConfig(level=logging.ERROR)
 
+# The asyncio tests use async generators, which are a syntax error before Python 3.6
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 6) else []
+
 
 db_config = {
     'default': 'postgres',
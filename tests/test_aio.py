@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+
+from chomper import Importer, Item
+from chomper.exceptions import DropItem
+from chomper.exporters import Exporter
+from chomper.feeders import Feeder
+
+
+class AsyncRangeFeeder(Feeder):
+
+    def __init__(self, count, delay=0):
+        self.count = count
+        self.delay = delay
+
+    async def feed(self, item):
+        for number in range(self.count):
+            await asyncio.sleep(self.delay)
+            yield Item(number=number)
+
+
+class AsyncCollector(Exporter):
+
+    def __init__(self):
+        self.items = []
+        self.running = 0
+        self.max_running = 0
+
+    async def export(self, item):
+        self.running += 1
+        self.max_running = max(self.running, self.max_running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+
+        if item.number % 10 == 0:
+            raise DropItem()
+
+        self.items.append(item)
+        return item
+
+
+class AsyncImporterTest(unittest.TestCase):
+
+    def test_arun(self):
+        exporter = AsyncCollector()
+
+        class TestImporter(Importer):
+            concurrency = 20
+            pipeline = [
+                AsyncRangeFeeder(100),
+                Item.number.filter(lambda value: value * 2),
+                exporter
+            ]
+
+        importer = TestImporter()
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(importer.arun())
+        finally:
+            loop.close()
+
+        self.assertEqual(importer.items_processed, 80)
+        self.assertEqual(importer.items_dropped, 20)
+        self.assertEqual(sorted(item.number for item in exporter.items),
+                         [number for number in range(0, 200, 2) if number % 10])
+        self.assertEqual(exporter.max_running, 20)
+
+    def test_arun_closes_on_error(self):
+        closed = []
+
+        class FailingExporter(Exporter):
+
+            async def export(self, item):
+                raise ValueError('exporter down')
+
+            def close(self):
+                closed.append(True)
+
+        class TestImporter(Importer):
+            pipeline = [
+                AsyncRangeFeeder(3),
+                FailingExporter()
+            ]
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertRaises(ValueError, loop.run_until_complete, TestImporter().arun())
+        finally:
+            loop.close()
+
+        self.assertEqual(closed, [True])
+
+    def test_arun_stats(self):
+        class TestImporter(Importer):
+            pipeline = [
+                AsyncRangeFeeder(5, delay=0.01),
+                Item.number.filter(lambda value: value * 2)
+            ]
+
+        importer = TestImporter()
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(importer.arun())
+        finally:
+            loop.close()
+
+        feeder, mapper = importer.stats()['actions']
+        self.assertEqual((feeder['calls'], feeder['items_in'], feeder['items_out']), (1, 1, 5))
+        self.assertTrue(feeder['time'] >= 0.05)
+        self.assertEqual((mapper['calls'], mapper['items_in'], mapper['items_out']), (5, 5, 5))
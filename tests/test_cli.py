@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+from chomper.cli import main, load_importer, get_parser, get_options
+
+
+IMPORTER_MODULE = '''
+from chomper import Importer, Item
+from chomper.feeders import ListFeeder
+
+
+class CliImporter(Importer):
+    close_when_idle = False
+    pipeline = [
+        ListFeeder([dict(number=number) for number in range(20)]),
+        Item.drop(Item.number >= 15)
+    ]
+
+
+not_an_importer = object()
+'''
+
+
+class CliTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.tmp_dir, 'cli_importers.py'), 'w') as f:
+            f.write(IMPORTER_MODULE)
+        sys.path.insert(0, self.tmp_dir)
+
+    def tearDown(self):
+        sys.path.remove(self.tmp_dir)
+        sys.modules.pop('cli_importers', None)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_importer(self):
+        self.assertEqual(load_importer('cli_importers:CliImporter').__name__, 'CliImporter')
+        self.assertRaises(ValueError, load_importer, 'cli_importers')
+        self.assertRaises(ValueError, load_importer, 'cli_importers:Missing')
+        self.assertRaises(ValueError, load_importer, 'cli_importers:not_an_importer')
+
+    def test_options(self):
+        args = get_parser().parse_args(['cli_importers:CliImporter', '-w', '4', '--batch-size', '50', '--once'])
+        self.assertEqual(get_options(args), dict(workers=4, batch_size=50, close_when_idle=True))
+
+        args = get_parser().parse_args(['cli_importers:CliImporter', '--long-running'])
+        self.assertEqual(get_options(args), dict(close_when_idle=False))
+
+    def test_run(self):
+        stats_path = os.path.join(self.tmp_dir, 'stats.json')
+        profile_path = os.path.join(self.tmp_dir, 'run.prof')
+
+        result = main(['cli_importers:CliImporter', '--once', '--batch-size', '5', '--stats', stats_path,
+                       '--profile', profile_path, '--log-level', 'error'])
+
+        with open(stats_path) as f:
+            stats = json.load(f)
+
+        self.assertEqual(result, 0)
+        self.assertEqual(stats['items_processed'], 15)
+        self.assertEqual(stats['items_dropped'], 5)
+        self.assertEqual([action['name'] for action in stats['actions']], ['ListFeeder', 'Dropper'])
+        self.assertTrue(os.path.exists(profile_path))
@@ -1,7 +1,9 @@
+import time
 import unittest
 
 from chomper import Item
-from chomper.feeders import ListFeeder, CsvFeeder, JsonFeeder, JsonLinesFeeder
+from chomper.feeders import Feeder, ListFeeder, CsvFeeder, JsonFeeder, JsonLinesFeeder, MergeFeeder
+from chomper.readers import FileReader
 
 
 class ReadersTest(unittest.TestCase):
@@ -45,6 +47,36 @@ class ReadersTest(unittest.TestCase):
 
         self.assertRaises(StopIteration, next, items)
 
+    def test_list_feeder_seek(self):
+        feeder = ListFeeder([dict(number=number) for number in range(5)])
+        items = feeder()
+        next(items)
+        next(items)
+        self.assertEqual(feeder.position, 2)
+
+        feeder.seek(feeder.position)
+        self.assertEqual([item.number for item in feeder()], [2, 3, 4])
+        self.assertEqual(feeder.position, 5)
+
+    def test_csv_feeder_seek(self):
+        feeder = CsvFeeder('tests/fixtures/data.csv', ['name', 'age'], skip=1)
+        items = feeder()
+        self.assertEqual(next(items).name, 'Jeff Winger')
+
+        # The header row is not skipped again when resuming part way through the file
+        resumed = CsvFeeder('tests/fixtures/data.csv', ['name', 'age'], skip=1)
+        resumed.seek(feeder.position)
+        self.assertEqual([item.name for item in resumed()], ['Annie Edison', 'Britta Perry'])
+
+    def test_csv_feeder_follow(self):
+        reader = FileReader.from_uri('tests/fixtures/data.csv', follow=True)
+        feeder = CsvFeeder(reader, ['name', 'age'], skip=1)
+        self.addCleanup(feeder.close)
+
+        self.assertEqual(len(list(feeder())), 3)
+        # The header row is only skipped at the start of the file
+        self.assertEqual(list(feeder()), [])
+
     def test_json_feeder(self):
         feeder = JsonFeeder('tests/fixtures/data.json')
         items = feeder()
@@ -78,3 +110,33 @@ class ReadersTest(unittest.TestCase):
         self.assertTrue(isinstance(item3, Item))
 
         self.assertRaises(StopIteration, next, items)
+
+    def test_merge_feeder(self):
+        class SlowFeeder(Feeder):
+            def feed(self, item):
+                for number in range(3):
+                    time.sleep(0.05)
+                    yield Item(source='slow', number=number)
+
+        feeders = [
+            SlowFeeder(),
+            ListFeeder([dict(source='first', number=number) for number in range(20)]),
+            ListFeeder([dict(source='second', number=number) for number in range(20)])
+        ]
+        items = list(MergeFeeder(feeders, prefetch=5)())
+
+        self.assertEqual(len(items), 43)
+        for source in ('slow', 'first', 'second'):
+            numbers = [item.number for item in items if item.source == source]
+            self.assertEqual(numbers, sorted(numbers))
+        # The slow feeder does not hold up the others
+        self.assertEqual(items[-1].source, 'slow')
+
+    def test_merge_feeder_errors(self):
+        class BrokenFeeder(Feeder):
+            def feed(self, item):
+                yield Item(number=1)
+                raise ValueError('broken')
+
+        feeder = MergeFeeder([BrokenFeeder(), ListFeeder([dict(number=2)])])
+        self.assertRaises(ValueError, list, feeder())
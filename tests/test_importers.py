@@ -0,0 +1,843 @@
+import os
+import time
+import shutil
+import tempfile
+import logging
+import unittest
+
+import threading
+
+from chomper import Importer, Item
+from chomper.concurrency import IoBound, Stage, Spool, AdaptiveLimit
+from chomper.exceptions import DropItem, ItemNotImportable
+from chomper.exporters import Exporter
+from chomper.feeders import ListFeeder, JsonLinesFeeder
+from chomper.plan import ExecutionPlan, ACTION, BRANCH, END, DONE
+from chomper.stats import ActionStats
+from chomper.support.checkpoint import CheckpointStore
+
+
+class BatchCollector(Exporter):
+
+    def __init__(self):
+        self.batches = []
+
+    def export(self, item):
+        self.batches.append([dict(item)])
+        return item
+
+    def export_batch(self, items):
+        self.batches.append([dict(item) for item in items])
+        return [item for item in items if item.title != 'drop']
+
+
+def collect(results):
+    def func(item):
+        results.append(dict(item))
+        return item
+    return func
+
+
+class ExecutionPlanTest(unittest.TestCase):
+
+    def test_flat_pipeline(self):
+        first, second = lambda item: item, lambda item: item
+        plan = ExecutionPlan([first, second])
+
+        self.assertEqual(len(plan), 3)
+        self.assertEqual(plan.steps[0][:3], (ACTION, first, 1))
+        self.assertEqual(plan.steps[1][:3], (ACTION, second, 2))
+        self.assertEqual(plan.steps[2].op, DONE)
+
+    def test_batch_methods(self):
+        processor = Item.title.set('hello')
+        plan = ExecutionPlan([lambda item: item, processor])
+
+        self.assertEqual(plan.steps[0].batch, None)
+        self.assertEqual(plan.steps[1].batch, processor.process_batch)
+
+    def test_sibling_branches(self):
+        action = lambda item: item
+        plan = ExecutionPlan([[action], [action], action, [action], [[action], [action]]])
+
+        self.assertEqual(plan.siblings, {0: ((6, 8), 2), 3: ((10, 12), 5), 12: ((15, 17), 14)})
+
+    def test_nested_branches(self):
+        action = lambda item: item
+        plan = ExecutionPlan([action, [action, [action]], action])
+
+        self.assertEqual([step.op for step in plan], [ACTION, BRANCH, ACTION, DONE,
+                                                      ACTION, BRANCH, END,
+                                                      ACTION, END])
+        self.assertEqual(plan.steps[1].action, 4)
+        self.assertEqual(plan.steps[5].action, 7)
+
+
+class ImporterTest(unittest.TestCase):
+
+    def test_run(self):
+        results = []
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(title='one'), dict(title='two'), dict(title='three')]),
+                Item.drop(Item.title == 'two'),
+                Item.title.filter(lambda value: value.upper()),
+                collect(results)
+            ]
+
+        importer = TestImporter()
+        importer.run()
+
+        self.assertEqual(results, [dict(title='ONE'), dict(title='THREE')])
+        self.assertEqual(importer.items_processed, 2)
+        self.assertEqual(importer.items_dropped, 1)
+
+    def test_branches_receive_copies(self):
+        branch_results = []
+        results = []
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(title='one'), dict(title='two')]),
+                [
+                    Item.title.set('branch'),
+                    collect(branch_results)
+                ],
+                collect(results)
+            ]
+
+        importer = TestImporter()
+        importer.run()
+
+        self.assertEqual(branch_results, [dict(title='branch'), dict(title='branch')])
+        self.assertEqual(results, [dict(title='one'), dict(title='two')])
+        self.assertEqual(importer.items_processed, 2)
+
+    def test_branches_copy_on_write(self):
+        branch_results = []
+        results = []
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(title='one', meta=dict(source='list'))]),
+                [
+                    Item.meta.source.set('branch'),
+                    collect(branch_results)
+                ],
+                [
+                    Item.title.set('other'),
+                    collect(branch_results)
+                ],
+                collect(results)
+            ]
+
+        for batch_size in (1, 2):
+            del branch_results[:], results[:]
+            TestImporter(batch_size=batch_size).run()
+
+            self.assertEqual(branch_results, [dict(title='one', meta=dict(source='branch')),
+                                              dict(title='other', meta=dict(source='list'))])
+            self.assertEqual(results, [dict(title='one', meta=dict(source='list'))])
+            self.assertTrue(branch_results[1]['meta'] is results[0]['meta'])
+
+    def test_concurrent_branches(self):
+        exported = threading.Event()
+        waited = []
+        results = []
+
+        def wait_for_export(item):
+            waited.append(exported.wait(1))
+            return item
+
+        def export(item):
+            exported.set()
+            return item
+
+        class TestImporter(Importer):
+            branch_threads = 2
+            pipeline = [
+                ListFeeder([dict(title='one')]),
+                [wait_for_export],
+                [Item.title.set('two'), export],
+                collect(results)
+            ]
+
+        for batch_size in (1, 2):
+            exported.clear()
+            del waited[:], results[:]
+            TestImporter(batch_size=batch_size).run()
+
+            self.assertEqual(waited, [True])
+            self.assertEqual(results, [dict(title='one')])
+
+    def test_run_batches(self):
+        results = []
+        exporter = BatchCollector()
+
+        class TestImporter(Importer):
+            batch_size = 2
+            pipeline = [
+                ListFeeder([dict(title='one'), dict(title='two'), dict(title='drop'), dict(title='four'),
+                            dict(title='five')]),
+                Item.drop(Item.title == 'two'),
+                exporter,
+                collect(results)
+            ]
+
+        importer = TestImporter()
+        importer.run()
+
+        self.assertEqual(exporter.batches, [[dict(title='one')], [dict(title='drop'), dict(title='four')],
+                                            [dict(title='five')]])
+        self.assertEqual(results, [dict(title='one'), dict(title='four'), dict(title='five')])
+        self.assertEqual(importer.items_processed, 3)
+        self.assertEqual(importer.items_dropped, 2)
+
+    def test_rejected_batches(self):
+        exported = []
+
+        class TransactionalExporter(Exporter):
+
+            def export(self, item):
+                if item.title == 'bad':
+                    raise ItemNotImportable('Could not insert %s' % item.title)
+                exported.append(item.title)
+                return item
+
+            def export_batch(self, items):
+                # One bad row rolls back the whole batch
+                if any(item.title == 'bad' for item in items):
+                    raise ItemNotImportable('Could not insert the batch')
+                exported.extend(item.title for item in items)
+                return items
+
+        def reject_worse(value):
+            if value == 'worse':
+                raise ItemNotImportable('Could not process %s' % value)
+            return value
+
+        class TestImporter(Importer):
+            batch_size = 3
+            pipeline = [
+                ListFeeder([dict(title='one'), dict(title='bad'), dict(title='three'), dict(title='worse'),
+                            dict(title='five')]),
+                Item.title.filter(reject_worse),
+                TransactionalExporter()
+            ]
+
+        importer = TestImporter()
+        importer.run()
+
+        # Only the items that fail on their own are dropped
+        self.assertEqual(exported, ['one', 'three', 'five'])
+        self.assertEqual(importer.items_processed, 3)
+        self.assertEqual(importer.items_dropped, 2)
+        self.assertEqual([action['items_in'] for action in importer.stats()['actions']], [1, 5, 4])
+
+    def test_batch_returning_none(self):
+        warnings = []
+
+        class WriteOnlyExporter(Exporter):
+
+            def export_batch(self, items):
+                pass
+
+        class TestImporter(Importer):
+            batch_size = 2
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(3)]),
+                WriteOnlyExporter()
+            ]
+
+        logger = logging.getLogger('TestImporter')
+        handler = logging.Handler()
+        handler.emit = lambda record: warnings.append(record.getMessage())
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+        try:
+            importer = TestImporter()
+            importer.run()
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(logging.NOTSET)
+
+        self.assertEqual(importer.items_processed, 0)
+        self.assertEqual(importer.items_dropped, 3)
+        self.assertEqual(len(warnings), 2)
+        self.assertTrue(warnings[0].startswith('WriteOnlyExporter returned None for a batch of 2 items'))
+
+    def test_iter(self):
+        fed = []
+        closed = []
+
+        class TestFeeder(ListFeeder):
+            def parse(self, item):
+                fed.append(item)
+                return super(TestFeeder, self).parse(item)
+
+            def close(self):
+                closed.append(True)
+
+        class TestImporter(Importer):
+            pipeline = [
+                TestFeeder([dict(number=number) for number in range(10)]),
+                Item.drop(Item.number == 1)
+            ]
+
+        items = TestImporter().iter()
+        self.assertEqual(next(items), dict(number=0))
+        self.assertEqual(next(items), dict(number=2))
+        self.assertEqual(len(fed), 3)
+
+        items.close()
+        self.assertEqual(closed, [True])
+
+        for kwargs in (dict(), dict(batch_size=3), dict(workers=2, chunk_size=3)):
+            importer = TestImporter(**kwargs)
+            self.assertEqual([item.number for item in importer.iter()], [0] + list(range(2, 10)))
+            self.assertEqual(importer.items_processed, 9)
+
+    def test_feeders_are_streamed(self):
+        fed = []
+        seen = []
+
+        def feeder(item):
+            for number in range(10):
+                fed.append(number)
+                yield Item(number=number)
+
+        def exporter(item):
+            seen.append(len(fed))
+            return item
+
+        for batch_size in (1, 3):
+            del fed[:], seen[:]
+            TestImporter = type('TestImporter', (Importer,), dict(pipeline=[feeder, exporter], batch_size=batch_size))
+            TestImporter().run()
+
+            self.assertEqual(seen[0], batch_size)
+            self.assertEqual(len(seen), 10)
+
+    def test_run_workers(self):
+        class TestImporter(Importer):
+            workers = 2
+            chunk_size = 10
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(100)]),
+                Item.drop(Item.number >= 90),
+                Item.number.filter(lambda value: value * 2)
+            ]
+
+        for ordered in (True, False):
+            importer = TestImporter(ordered=ordered)
+            importer.run()
+
+            self.assertEqual(importer.items_processed, 90)
+            self.assertEqual(importer.items_dropped, 10)
+
+        importer = TestImporter()
+        results = list(importer._iter_parallel(collect=True))
+        self.assertEqual([item.number for item in results], list(range(0, 180, 2)))
+
+    def test_run_partitioned_workers(self):
+        class TestImporter(Importer):
+            workers = 3
+            chunk_size = 4
+            partition_by = ['symbol', Item.exchange]
+            pipeline = [
+                ListFeeder([dict(symbol='S%d' % (number % 5), exchange='ASX', number=number) for number in range(100)]),
+                Item.drop(Item.number >= 90)
+            ]
+
+        importer = TestImporter()
+        results = list(importer._iter_partitioned(collect=True))
+
+        self.assertEqual(sorted(item.number for item in results), list(range(90)))
+        for symbol in ('S0', 'S1', 'S2', 'S3', 'S4'):
+            numbers = [item.number for item in results if item.symbol == symbol]
+            self.assertEqual(numbers, sorted(numbers))
+
+        importer = TestImporter()
+        importer.run()
+        self.assertEqual(importer.items_processed, 90)
+        self.assertEqual(importer.items_dropped, 10)
+
+    def test_stages(self):
+        threads = {}
+        results = []
+
+        def record_thread(name):
+            def func(item):
+                threads.setdefault(name, set()).add(threading.current_thread())
+                return item
+            return func
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(50)]),
+                record_thread('feed'),
+                Stage(size=5),
+                Item.drop(Item.number >= 45),
+                record_thread('transform'),
+                Stage(size=5, name='export'),
+                record_thread('export'),
+                collect(results)
+            ]
+
+        for batch_size in (1, 4):
+            threads.clear()
+            del results[:]
+            importer = TestImporter(batch_size=batch_size)
+            importer.run()
+
+            self.assertEqual([item['number'] for item in results], list(range(45)))
+            self.assertEqual(importer.items_processed, 45)
+            self.assertEqual(importer.items_dropped, 5)
+            self.assertEqual(len(set.union(*threads.values())), 3)
+            self.assertEqual(threads['export'], set([threading.current_thread()]))
+
+            stats = importer.stats()['stages']
+            self.assertEqual([stage['name'] for stage in stats], ['stage 1', 'export'])
+            self.assertEqual([stage['items'] for stage in stats], [50, 45])
+            self.assertTrue(all(stage['max_depth'] <= 5 for stage in stats))
+
+    def test_memory_budget(self):
+        release = threading.Event()
+        results = []
+
+        def wait_for_feeder(item):
+            release.wait(5)
+            return item
+
+        def feeder(item):
+            for number in range(200):
+                yield Item(number=number, text='x' * 100)
+            release.set()
+
+        class TestImporter(Importer):
+            memory_budget = 2000
+            pipeline = [
+                feeder,
+                Stage(size=10),
+                wait_for_feeder,
+                collect(results)
+            ]
+
+        importer = TestImporter()
+        importer.run()
+        stats = importer.stats()
+
+        self.assertEqual([item['number'] for item in results], list(range(200)))
+        self.assertTrue(stats['spilled_items'] > 150)
+        self.assertEqual(stats['spilled_items'], stats['stages'][0]['spilled_items'])
+        self.assertTrue(stats['spilled_bytes'] > 0)
+
+        TestImporter.pipeline = [
+            ListFeeder([dict(number=number, symbol='S%d' % (number % 3)) for number in range(300)]),
+            Item.number.filter(lambda value: value * 2)
+        ]
+        importer = TestImporter(workers=2, chunk_size=5, partition_by=['symbol'])
+        results = list(importer.iter())
+
+        self.assertEqual(sorted(item.number for item in results), list(range(0, 600, 2)))
+        self.assertTrue(importer.stats()['spilled_items'] > 0)
+
+    def test_spool(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'spool.db')
+        results = []
+        exporter = dict(failures=2, down_from=150)
+
+        def export(item):
+            # The exporter fails twice, then is down for good from item 150
+            if exporter['failures']:
+                exporter['failures'] -= 1
+                raise ValueError('exporter down')
+            if exporter['down_from'] is not None and item.number >= exporter['down_from']:
+                raise ValueError('exporter down')
+            results.append(item.number)
+            return item
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(200)]),
+                Spool(path, batch_size=50, max_retries=2, retry_delay=0.01),
+                export
+            ]
+
+        importer = TestImporter()
+        self.assertRaises(ValueError, importer.run)
+        stats = importer.stats()['stages'][0]
+
+        # Batches are retried, and the feeder wrote every item before the exporter gave up
+        self.assertEqual(results, list(range(150)))
+        self.assertEqual((stats['items'], stats['drained'], stats['depth'], stats['retries']), (200, 150, 50, 4))
+
+        # A restarted importer drains what was left, before the items fed by the new run
+        exporter['down_from'] = None
+        del results[:]
+        importer = TestImporter()
+        importer.run()
+        self.assertEqual(results, list(range(150, 200)) + list(range(200)))
+        self.assertEqual(importer.items_processed, 250)
+
+    def test_long_running_waits_between_runs(self):
+        runs = []
+
+        class CountingFeeder(ListFeeder):
+            def feed(self, item):
+                runs.append(True)
+                return super(CountingFeeder, self).feed(item)
+
+        class TestImporter(Importer):
+            close_when_idle = False
+            idle_delay = 0.05
+            pipeline = [CountingFeeder([dict(number=1), dict(number=2), dict(number=3)])]
+
+        # The feeder has items on every run, the importer still waits "idle_delay" between them
+        items = TestImporter().iter()
+        start = time.time()
+        for _ in items:
+            if time.time() - start > 0.3:
+                break
+        items.close()
+        self.assertTrue(2 <= len(runs) <= 8, len(runs))
+
+    def test_checkpoints(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'checkpoints.json')
+        data_path = os.path.join(tmp_dir, 'data.jsonlines')
+        results = []
+        exporter = dict(down_from=75)
+
+        with open(data_path, 'w') as f:
+            for number in range(100):
+                f.write('{"number": %d}\n' % number)
+
+        def export(item):
+            if exporter['down_from'] is not None and item.number >= exporter['down_from']:
+                raise ValueError('exporter down')
+            results.append(item.number)
+            return item
+
+        for batch_size in [1, 8]:
+            class TestImporter(Importer):
+                pipeline = [
+                    JsonLinesFeeder(data_path),
+                    IoBound(export, threads=4),
+                ]
+
+            importer = TestImporter(checkpoint_path=path, checkpoint_interval=20, batch_size=batch_size)
+            self.assertRaises(ValueError, importer.run)
+            self.assertEqual(sorted(results)[:60], list(range(60)))
+            self.assertEqual(CheckpointStore(path).get('TestImporter'), len('{"number": 0}\n') * 10 +
+                             len('{"number": 10}\n') * 50)
+
+            # Resumes after the last segment that finished
+            exporter['down_from'] = None
+            del results[:]
+            importer = TestImporter(checkpoint_path=path, checkpoint_interval=20, batch_size=batch_size)
+            importer.run()
+            self.assertEqual(sorted(results), list(range(60, 100)))
+            self.assertIsNone(CheckpointStore(path).get('TestImporter'))
+
+            exporter['down_from'] = 75
+            del results[:]
+
+    def test_skip_unchanged_inputs(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        data_path = os.path.join(tmp_dir, 'data.jsonlines')
+        results = []
+
+        def write(numbers, mtime):
+            with open(data_path, 'w') as f:
+                for number in numbers:
+                    f.write('{"number": %d}\n' % number)
+            os.utime(data_path, (mtime, mtime))
+
+        def export(item):
+            if item.number < 0:
+                raise ValueError('invalid number')
+            results.append(item.number)
+            return item
+
+        class TestImporter(Importer):
+            input_fingerprint_path = os.path.join(tmp_dir, 'inputs.json')
+            pipeline = [
+                JsonLinesFeeder(data_path),
+                export
+            ]
+
+        write([1, 2], 1000)
+        importer = TestImporter()
+        importer.run()
+        importer.open()
+        importer.run()
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(importer.stats()['runs_skipped'], 1)
+
+        # A failed run is not skipped the next time
+        write([-1], 2000)
+        self.assertRaises(ValueError, TestImporter().run)
+        self.assertRaises(ValueError, TestImporter().run)
+
+        write([3], 3000)
+        importer = TestImporter()
+        importer.run()
+        self.assertEqual(results, [1, 2, 3])
+        self.assertEqual(importer.runs_skipped, 0)
+
+        # Feeders that can not tell if their input changed always run
+        class ListImporter(TestImporter):
+            pipeline = [ListFeeder([dict(number=4)]), export]
+
+        ListImporter().run()
+        ListImporter().run()
+        self.assertEqual(results, [1, 2, 3, 4, 4])
+
+    def test_list_feeder_checkpoints(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'checkpoints.json')
+        CheckpointStore(path).save('TestImporter', 3)
+        results = []
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(5)]),
+                collect(results)
+            ]
+
+        TestImporter(checkpoint_path=path).run()
+        self.assertEqual(results, [dict(number=3), dict(number=4)])
+        self.assertIsNone(CheckpointStore(path).get('TestImporter'))
+
+    def test_spool_batches(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        exporter = BatchCollector()
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(title=str(number)) for number in range(25)]),
+                Spool(os.path.join(tmp_dir, 'spool.db'), batch_size=10),
+                Item.title.filter(lambda value: value.upper()),
+                IoBound(lambda item: item, threads=2),
+                exporter
+            ]
+
+        # The exporter gets the spool's batches, even though the importer does not batch items
+        importer = TestImporter()
+        importer.run()
+        self.assertEqual([len(batch) for batch in exporter.batches], [10, 10, 5])
+        self.assertEqual(importer.items_processed, 25)
+
+    def test_stage_exceptions(self):
+        def fail(item):
+            if item.number == 20:
+                raise ValueError('failed')
+            return item
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(50)]),
+                fail,
+                Stage(size=2),
+                Stage(size=2),
+                lambda item: item
+            ]
+
+        self.assertRaises(ValueError, TestImporter().run)
+
+    def test_io_bound_actions(self):
+        threads = set()
+        results = []
+
+        def record_thread(item):
+            threads.add(threading.current_thread())
+            if item.number % 10 == 0:
+                raise DropItem()
+            return item
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(50)]),
+                IoBound([record_thread, Item.number.filter(lambda value: value * 2)], threads=4, in_flight=3),
+                collect(results)
+            ]
+
+        importer = TestImporter()
+        importer.run()
+
+        self.assertFalse(threading.current_thread() in threads)
+        self.assertEqual(sorted(item['number'] for item in results),
+                         [number * 2 for number in range(50) if number % 10])
+        self.assertEqual(importer.items_processed, 45)
+        self.assertEqual(importer.items_dropped, 5)
+
+    def test_adaptive_io_bound(self):
+        in_flight = [0]
+        peak = [0]
+        lock = threading.Lock()
+
+        def slow_when_busy(item):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            # Slows down sharply with more than 4 requests at once
+            threading.Event().wait(0.002 if in_flight[0] <= 4 else 0.02)
+            with lock:
+                in_flight[0] -= 1
+            return item
+
+        io_bound = IoBound(slow_when_busy, threads=16, adaptive=AdaptiveLimit(max_limit=16, initial=2))
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(300)]),
+                io_bound
+            ]
+
+        importer = TestImporter()
+        importer.run()
+
+        self.assertEqual(importer.items_processed, 300)
+        self.assertTrue(io_bound.adaptive.increases > 0)
+        self.assertTrue(io_bound.adaptive.decreases > 0)
+        self.assertTrue(io_bound.in_flight < 16)
+        self.assertTrue(peak[0] < 16)
+        self.assertEqual(importer.stats()['actions'][1]['limit'], io_bound.in_flight)
+        self.assertIsNone(importer.stats()['actions'][0]['limit'])
+
+    def test_adaptive_io_bound_rejections(self):
+        def reject_odd(item):
+            threading.Event().wait(0.001)
+            if item['number'] % 2:
+                raise ItemNotImportable('Rejected %d' % item['number'])
+            return item
+
+        io_bound = IoBound(reject_odd, threads=8, adaptive=AdaptiveLimit(max_limit=8, initial=8))
+
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(100)]),
+                io_bound
+            ]
+
+        importer = TestImporter()
+        importer.run()
+
+        self.assertEqual(importer.items_processed, 50)
+        self.assertEqual(importer.items_dropped, 50)
+        self.assertTrue(io_bound.adaptive.decreases > 0)
+        self.assertTrue(io_bound.in_flight < 8)
+
+    def test_stats(self):
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(10)]),
+                Item.drop(Item.number >= 8),
+                Item.number.filter(lambda value: value * 2)
+            ]
+
+        for kwargs in (dict(), dict(batch_size=3), dict(workers=2, chunk_size=2)):
+            importer = TestImporter(**kwargs)
+            importer.run()
+            stats = importer.stats()
+
+            self.assertEqual(stats['items_processed'], 8)
+            self.assertEqual(stats['items_dropped'], 2)
+            self.assertEqual([action['name'] for action in stats['actions']], ['ListFeeder', 'Dropper', 'Filter'])
+            self.assertEqual([(action['items_in'], action['items_out'], action['items_dropped'])
+                              for action in stats['actions']], [(1, 10, 0), (10, 8, 2), (8, 8, 0)])
+            self.assertTrue(all(action['p50'] <= action['p99'] for action in stats['actions']))
+
+    def test_io_bound_stats_per_importer(self):
+        class TestImporter(Importer):
+            pipeline = [
+                ListFeeder([dict(number=number) for number in range(10)]),
+                IoBound(Item.number.filter(lambda value: value * 2), threads=2)
+            ]
+
+        for _ in range(2):
+            importer = TestImporter()
+            importer.run()
+            self.assertEqual([action['items_in'] for action in importer.stats()['actions']], [1, 10])
+
+        importer = TestImporter(collect_stats=False)
+        importer.run()
+        self.assertEqual(importer.stats()['actions'], [])
+
+
+class ActionStatsTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        stats = ActionStats('test')
+        for duration in range(1, 101):
+            stats.record(duration / 1000.0)
+
+        self.assertEqual(stats.calls, 100)
+        self.assertAlmostEqual(stats.percentile(50), 0.05, delta=0.05 * 0.13)
+        self.assertAlmostEqual(stats.percentile(99), 0.099, delta=0.099 * 0.13)
+
+    def test_merge(self):
+        stats = ActionStats('test')
+        other = ActionStats('test')
+        stats.record(0.001, items_out=1)
+        other.record(0.002, dropped=1)
+        other.record(0.003, exceptions=1)
+
+        stats.merge(other.snapshot(reset=True))
+
+        self.assertEqual(stats.calls, 3)
+        self.assertEqual(stats.items_in, 3)
+        self.assertEqual(stats.items_out, 1)
+        self.assertEqual(stats.items_dropped, 1)
+        self.assertEqual(stats.exceptions, 1)
+        self.assertAlmostEqual(stats.time, 0.006)
+        self.assertEqual(sum(stats.histogram.values()), 3)
+        self.assertEqual(other.calls, 0)
+
+
+class AdaptiveLimitTest(unittest.TestCase):
+
+    def test_increase(self):
+        limit = AdaptiveLimit(min_limit=1, max_limit=10)
+        for _ in range(20):
+            limit.record(0.01)
+        self.assertEqual(limit.limit, 6)
+
+        for _ in range(100):
+            limit.record(0.01)
+        self.assertEqual(limit.limit, 10)
+
+    def test_decrease(self):
+        limit = AdaptiveLimit(min_limit=2, max_limit=20, initial=16)
+        limit.record(0.01)
+        limit.record(0.01, error=True)
+        self.assertEqual(limit.limit, 8)
+
+        # Calls already in flight at the old limit do not back off again
+        limit.record(0.01, error=True)
+        self.assertEqual(limit.limit, 8)
+
+        for _ in range(16):
+            limit.record(0.01, error=True)
+        self.assertEqual(limit.limit, 4)
+
+        for _ in range(20):
+            limit.record(0.01, error=True)
+        self.assertEqual(limit.limit, 2)
+
+    def test_latency(self):
+        limit = AdaptiveLimit(max_limit=20, initial=10)
+        for _ in range(10):
+            limit.record(0.01)
+        for _ in range(5):
+            limit.record(0.1)
+        self.assertTrue(limit.limit < 10)
+        self.assertEqual(limit.decreases, 1)
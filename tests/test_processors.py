@@ -1,9 +1,13 @@
+import os
+import shutil
+import tempfile
 import unittest
 
-from chomper import Item
-from chomper.exceptions import DropItem
-from chomper.processors import Defaulter, Assigner, Dropper, Filter, Mapper, Picker, Omitter, item_processor, \
-    field_processor
+from chomper import Importer, Item
+from chomper.exceptions import DropItem, ItemNotImportable
+from chomper.feeders import ListFeeder
+from chomper.processors import Defaulter, Assigner, Dropper, Filter, Mapper, Picker, Omitter, UnchangedSkipper, \
+    item_processor, field_processor
 
 
 class ProcessorsTest(unittest.TestCase):
@@ -175,3 +179,78 @@ class ProcessorsTest(unittest.TestCase):
         self.assertFalse(hasattr(processed_item, 'field1'))
         self.assertFalse(hasattr(processed_item, 'field2'))
         self.assertTrue(hasattr(processed_item, 'field3'))
+
+    def test_forked_items(self):
+        item = Item(address=dict(city='Brisbane'), tags=['one'])
+        forked = item.fork()
+
+        Defaulter(Item.address, dict(country='Australia'))(forked)
+        Assigner(Item.tags[0], 'two')(item)
+        picked = Picker(Item, [Item.address])(forked)
+        picked[Item.address.city] = 'Sydney'
+
+        self.assertEqual(item, dict(address=dict(city='Brisbane'), tags=['two']))
+        self.assertEqual(forked, dict(address=dict(city='Brisbane', country='Australia'), tags=['one']))
+        self.assertEqual(picked, dict(address=dict(city='Sydney', country='Australia')))
+        self.assertTrue(item.fork().tags is item.tags)
+
+    def test_unchanged_skipper(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        rows = [dict(id=1, title='one', seen=1), dict(id=2, title='two', seen=1)]
+        exported = []
+        exporter = dict(fail=False, reject=None)
+
+        def export(item):
+            if exporter['fail']:
+                raise ValueError('exporter down')
+            if item.id == exporter['reject']:
+                raise ItemNotImportable('rejected')
+            exported.append(item.id)
+            return item
+
+        class TestImporter(Importer):
+            fingerprint_path = os.path.join(tmp_dir, 'fingerprints.db')
+            pipeline = [
+                ListFeeder(rows),
+                Item.skip_unchanged(key=[Item.id], fields=['title']),
+                export
+            ]
+
+        TestImporter().run()
+        self.assertEqual(exported, [1, 2])
+
+        # Only the fields that were picked are compared
+        rows[0]['seen'] = 2
+        rows[1]['title'] = 'TWO'
+        del exported[:]
+        importer = TestImporter()
+        importer.run()
+        self.assertEqual(exported, [2])
+        self.assertEqual(importer.items_dropped, 1)
+
+        # Fingerprints are not saved when the items were not exported
+        rows[0]['title'] = 'ONE'
+        exporter['fail'] = True
+        self.assertRaises(ValueError, TestImporter().run)
+        exporter['fail'] = False
+        del exported[:]
+        TestImporter().run()
+        self.assertEqual(exported, [1])
+
+        # Items rejected by the exporter are not skipped the next time
+        rows[1]['title'] = 'Two'
+        exporter['reject'] = 2
+        del exported[:]
+        TestImporter().run()
+        self.assertEqual(exported, [])
+        exporter['reject'] = None
+        TestImporter().run()
+        self.assertEqual(exported, [2])
+
+        # Fingerprints are kept separately for each importer
+        del exported[:]
+        TestImporter(name='other').run()
+        self.assertEqual(exported, [1, 2])
+
+        self.assertRaises(ValueError, UnchangedSkipper(Item, 'id'), Item(id=1))
@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 import responses
 
@@ -57,6 +60,82 @@ class ReadersTest(unittest.TestCase):
         self.assertEqual(next(reader_lines_data), '{ "name": "Britta Perry", "age": 27 }')
         self.assertRaises(StopIteration, next, reader_lines_data)
 
+    def test_file_reader_seek(self):
+        reader = FileReader.from_uri('tests/fixtures/data.jsonlines')
+        lines = reader.read()
+        self.assertEqual(reader.position, 0)
+        self.assertEqual(next(lines), '{ "name": "Jeff Winger", "age": 32 }')
+        position = reader.position
+        self.assertEqual(position, len('{ "name": "Jeff Winger", "age": 32 }\n'))
+
+        reader = FileReader.from_uri('tests/fixtures/data.jsonlines')
+        reader.seek(position)
+        self.assertFalse(reader.at_start())
+        self.assertEqual(list(reader.read()), ['{ "name": "Annie Edison", "age": 24 }',
+                                               '{ "name": "Britta Perry", "age": 27 }'])
+        # Only the next read starts from the position
+        self.assertEqual(len(list(reader.read())), 3)
+
+        self.assertRaises(NotImplementedError, FileReader.from_uri('tests/fixtures/data.json', lines=False).seek, 0)
+
+    def test_file_reader_follow(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'data.jsonlines')
+        self.addCleanup(shutil.rmtree, directory)
+
+        with open(path, 'w') as f:
+            f.write('line 1\nline 2\nline')
+
+        reader = FileReader.from_uri(path, follow=True)
+        self.addCleanup(reader.close)
+
+        self.assertEqual(list(reader.read()), ['line 1', 'line 2'])
+        self.assertFalse(reader.wait(0.01))
+
+        with open(path, 'a') as f:
+            f.write(' 3\nline 4\n')
+
+        self.assertTrue(reader.wait(1))
+        self.assertEqual(list(reader.read()), ['line 3', 'line 4'])
+        self.assertEqual(list(reader.read()), [])
+
+    def test_file_reader_fingerprint(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'data.jsonlines')
+        self.addCleanup(shutil.rmtree, directory)
+
+        with open(path, 'w') as f:
+            f.write('line 1\n')
+        os.utime(path, (1000, 1000))
+
+        reader = FileReader.from_uri(path)
+        fingerprint = reader.fingerprint()
+        contents = reader.fingerprint(contents=True)
+        self.assertEqual(fingerprint, dict(size=7, mtime=1000))
+
+        # Written again with the same data
+        with open(path, 'w') as f:
+            f.write('line 1\n')
+        self.assertNotEqual(reader.fingerprint(), fingerprint)
+        self.assertEqual(reader.fingerprint(contents=True), contents)
+
+        with open(path, 'w') as f:
+            f.write('line 2\n')
+        self.assertNotEqual(reader.fingerprint(contents=True), contents)
+
+        self.assertIsNone(FileReader.from_uri(os.path.join(directory, 'missing')).fingerprint())
+        self.assertIsNone(FileReader.from_uri(path, follow=True).fingerprint())
+
+    @responses.activate
+    def test_http_reader_fingerprint(self):
+        url = 'http://example.com/data.json'
+        responses.add(responses.HEAD, url, headers={'ETag': '"abc"'})
+        responses.add(responses.HEAD, 'http://example.com/other.json')
+
+        self.assertEqual(HttpReader.from_uri(url).fingerprint(), dict(etag='"abc"', last_modified=None))
+        self.assertIsNone(HttpReader.from_uri('http://example.com/other.json').fingerprint())
+        self.assertIsNone(HttpReader.from_uri(url, method='post').fingerprint())
+
     @responses.activate
     def test_http_reader(self):
         url = 'http://example.com/data.json'
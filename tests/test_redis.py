@@ -0,0 +1,102 @@
+import os
+import uuid
+import threading
+import unittest
+
+from chomper import Importer, Item
+from chomper.exceptions import NotConfigured, WorkerError
+from chomper.feeders import ListFeeder
+
+try:
+    import redis
+    from chomper.contrib.redis import Coordinator, Worker, get_connection_pool
+except (ImportError, NotConfigured):
+    redis = None
+
+REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
+
+
+def redis_available():
+    if redis is None:
+        return False
+    try:
+        return redis.StrictRedis(REDIS_HOST, REDIS_PORT, socket_connect_timeout=1).ping()
+    except redis.ConnectionError:
+        return False
+
+
+def fail_on_77(item):
+    if item.number == 77:
+        raise ValueError('Failed on 77')
+    return item
+
+
+class NumbersImporter(Importer):
+    pipeline = [
+        ListFeeder([dict(number=number) for number in range(100)]),
+        Item.drop(Item.number < 10)
+    ]
+
+
+class FailingImporter(Importer):
+    pipeline = [
+        ListFeeder([dict(number=number) for number in range(100)]),
+        fail_on_77
+    ]
+
+
+@unittest.skipUnless(redis_available(), 'Needs a Redis server (set REDIS_HOST and REDIS_PORT)')
+class DistributedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.key = 'chomper:test:%s' % uuid.uuid4().hex
+        self.workers = []
+        self.threads = []
+
+    def tearDown(self):
+        for worker in self.workers:
+            worker.stop()
+        for thread in self.threads:
+            thread.join()
+        redis.StrictRedis(REDIS_HOST, REDIS_PORT).delete(self.key)
+
+    def start_workers(self, importer_cls, count):
+        for _ in range(count):
+            worker = Worker(importer_cls(), self.key, host=REDIS_HOST, port=REDIS_PORT)
+            thread = threading.Thread(target=worker.run)
+            thread.start()
+            self.workers.append(worker)
+            self.threads.append(thread)
+
+    def test_shared_connection_pools(self):
+        pool = get_connection_pool(REDIS_HOST, REDIS_PORT, db=0)
+        self.assertIs(get_connection_pool(REDIS_HOST, REDIS_PORT, db=0), pool)
+        self.assertIsNot(get_connection_pool(REDIS_HOST, REDIS_PORT, db=1), pool)
+
+    def test_coordinator(self):
+        self.start_workers(NumbersImporter, 3)
+
+        importer = NumbersImporter()
+        coordinator = Coordinator(importer, self.key, chunk_size=7, max_pending=4, result_timeout=10,
+                                  host=REDIS_HOST, port=REDIS_PORT)
+        coordinator.run()
+
+        self.assertEqual(coordinator.tasks_sent, 15)
+        self.assertEqual(importer.items_processed, 90)
+        self.assertEqual(importer.items_dropped, 10)
+        self.assertEqual([action['items_in'] for action in importer.stats()['actions']], [1, 100])
+        self.assertEqual(sum(worker.tasks_run for worker in self.workers), 15)
+
+    def test_worker_errors(self):
+        self.start_workers(FailingImporter, 1)
+
+        coordinator = Coordinator(FailingImporter(), self.key, chunk_size=10, result_timeout=10,
+                                  host=REDIS_HOST, port=REDIS_PORT)
+        with self.assertRaises(WorkerError) as context:
+            coordinator.run()
+        self.assertIn('Failed on 77', str(context.exception))
+
+    def test_no_workers(self):
+        coordinator = Coordinator(NumbersImporter(), self.key, result_timeout=1, host=REDIS_HOST, port=REDIS_PORT)
+        self.assertRaises(WorkerError, coordinator.run)
@@ -0,0 +1,150 @@
+import time
+import datetime
+import threading
+import unittest
+
+from chomper import Importer
+from chomper.feeders import ListFeeder
+from chomper.scheduler import Scheduler, Interval, Cron, make_schedule
+
+
+def timestamp(*args):
+    return time.mktime(datetime.datetime(*args).timetuple())
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def test_interval(self):
+        schedule = Interval(60, delay=5)
+        self.assertEqual(schedule.first_run(100), 105)
+        self.assertEqual(schedule.next_run(105), 165)
+        self.assertRaises(ValueError, Interval, 0)
+
+    def test_cron(self):
+        every_15 = Cron('*/15 * * * *')
+        self.assertEqual(every_15.next_run(timestamp(2020, 1, 1, 10, 7, 30)), timestamp(2020, 1, 1, 10, 15))
+        self.assertEqual(every_15.next_run(timestamp(2020, 1, 1, 10, 15)), timestamp(2020, 1, 1, 10, 30))
+        self.assertEqual(every_15.next_run(timestamp(2020, 1, 1, 23, 50)), timestamp(2020, 1, 2, 0, 0))
+
+        # 2020-01-01 was a Wednesday
+        weekdays = Cron('30 9 * * 1-5')
+        self.assertEqual(weekdays.next_run(timestamp(2020, 1, 3, 10, 0)), timestamp(2020, 1, 6, 9, 30))
+
+        monthly = Cron('0 0 31 * *')
+        self.assertEqual(monthly.next_run(timestamp(2020, 2, 1)), timestamp(2020, 3, 31))
+
+        # Either the day of month or the day of week
+        either = Cron('0 12 15 * 0')
+        self.assertEqual(either.next_run(timestamp(2020, 1, 1)), timestamp(2020, 1, 5, 12, 0))
+        self.assertEqual(either.next_run(timestamp(2020, 1, 12, 13)), timestamp(2020, 1, 15, 12, 0))
+
+        self.assertRaises(ValueError, Cron, '* * * *')
+        self.assertRaises(ValueError, Cron, '60 * * * *')
+        self.assertRaises(ValueError, Cron('0 0 30 2 *').next_run, timestamp(2020, 1, 1))
+
+    def test_make_schedule(self):
+        self.assertEqual(make_schedule(30).seconds, 30)
+        self.assertEqual(make_schedule(datetime.timedelta(minutes=2)).seconds, 120)
+        self.assertEqual(make_schedule('0 * * * *').expression, '0 * * * *')
+        self.assertRaises(ValueError, make_schedule, None)
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_run_pending(self):
+        collected = []
+
+        def collect(item):
+            collected.append(item)
+            return item
+
+        class ScheduledImporter(Importer):
+            close_when_idle = False
+            pipeline = [
+                ListFeeder([dict(number=1), dict(number=2)]),
+                collect
+            ]
+
+        scheduler = Scheduler()
+        job = scheduler.add(ScheduledImporter, 3600)
+        scheduler.add(ScheduledImporter, Interval(3600, delay=3600), name='later')
+
+        self.assertEqual(scheduler.run_pending(), [job])
+        scheduler.close()
+
+        self.assertEqual([item.number for item in collected], [1, 2])
+        self.assertEqual(scheduler.run_pending(), [])
+
+        stats = scheduler.stats()
+        self.assertEqual([job['name'] for job in stats], ['ScheduledImporter', 'later'])
+        self.assertEqual(stats[0]['runs'], 1)
+        self.assertEqual(stats[0]['importer']['items_processed'], 2)
+        self.assertEqual(stats[1]['runs'], 0)
+
+        # Runs again with the same importer
+        job.next_time = 0
+        scheduler.run_pending()
+        scheduler.close()
+        self.assertEqual(len(collected), 4)
+        self.assertEqual(job.importer.items_processed, 4)
+
+    def test_max_concurrent(self):
+        release = threading.Event()
+        started = []
+
+        def wait_for_release(item):
+            started.append(item)
+            release.wait(5)
+            return item
+
+        class SlowImporter(Importer):
+            pipeline = [ListFeeder([dict()]), wait_for_release]
+
+        scheduler = Scheduler(max_concurrent=2)
+        for name in ['one', 'two', 'three']:
+            scheduler.add(SlowImporter, 3600, name=name)
+
+        self.assertEqual([job.name for job in scheduler.run_pending()], ['one', 'two'])
+        # The third job is due, but has to wait for one of the others to finish
+        self.assertEqual(scheduler.run_pending(), [])
+
+        release.set()
+        scheduler.close()
+        self.assertEqual(len(started), 2)
+        self.assertEqual([job.name for job in scheduler.run_pending()], ['three'])
+        scheduler.close()
+
+    def test_failures(self):
+        def fail(item):
+            raise ValueError('failed')
+
+        class FailingImporter(Importer):
+            pipeline = [ListFeeder([dict()]), fail]
+
+        class OkImporter(Importer):
+            pipeline = [ListFeeder([dict()])]
+
+        scheduler = Scheduler()
+        scheduler.add(FailingImporter, 60)
+        scheduler.add(OkImporter, 60)
+        scheduler.run_pending()
+        scheduler.close()
+
+        failing, ok = scheduler.stats()
+        self.assertEqual((failing['runs'], failing['failures']), (1, 1))
+        self.assertEqual(failing['last_error'], "ValueError('failed')")
+        self.assertEqual((ok['runs'], ok['failures']), (1, 0))
+
+    def test_run_until_stopped(self):
+        runs = []
+
+        class CountingImporter(Importer):
+            pipeline = [ListFeeder([dict()]), lambda item: runs.append(item)]
+
+        scheduler = Scheduler()
+        scheduler.add(CountingImporter, 0.02)
+        timer = threading.Timer(0.2, scheduler.stop)
+        timer.start()
+        scheduler.run()
+
+        self.assertTrue(3 <= len(runs) <= 11)
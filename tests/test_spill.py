@@ -0,0 +1,74 @@
+import threading
+import unittest
+
+from chomper import Item
+from chomper.support.spill import SpillBuffer, estimate_size
+
+
+class SpillBufferTest(unittest.TestCase):
+
+    def test_estimate_size(self):
+        small = Item(title='one')
+        large = Item(title='one', tags=['x' * 100, 'y' * 100], meta=dict(source='z' * 100))
+        self.assertTrue(estimate_size(large) > estimate_size(small) + 300)
+
+    def test_in_memory(self):
+        buffer = SpillBuffer()
+        for number in range(100):
+            buffer.append(Item(number=number))
+
+        self.assertEqual(len(buffer), 100)
+        self.assertEqual([item.number for item in buffer.take(60)], list(range(60)))
+        self.assertEqual(buffer.spilled_items, 0)
+
+    def test_spill(self):
+        buffer = SpillBuffer(max_items=10)
+        for number in range(25):
+            buffer.append(Item(number=number))
+
+        self.assertEqual(len(buffer), 25)
+        self.assertEqual(buffer.spilled_items, 15)
+        self.assertTrue(buffer.spilled_bytes > 0)
+
+        # Items added while there are items on disk are spilled too, to keep them in order
+        self.assertEqual([item.number for item in buffer.take(12)], list(range(12)))
+        buffer.append(Item(number=25))
+        self.assertEqual(buffer.spilled_items, 16)
+
+        items = buffer.take(100)
+        self.assertEqual([item.number for item in items], list(range(12, 26)))
+        self.assertTrue(isinstance(items[-1], Item))
+        self.assertRaises(IndexError, buffer.popleft)
+
+        # Once the file has been read, items are kept in memory again
+        buffer.append(Item(number=26))
+        self.assertEqual(buffer.spilled_items, 16)
+        buffer.close()
+
+    def test_memory_budget(self):
+        item = Item(title='x' * 1000)
+        buffer = SpillBuffer(budget=estimate_size(item) * 3)
+        for _ in range(10):
+            buffer.append(item)
+
+        self.assertEqual(buffer.spilled_items, 7)
+        self.assertEqual(buffer.take(10), [item] * 10)
+
+    def test_threads(self):
+        buffer = SpillBuffer(max_items=5)
+        results = []
+
+        def add():
+            for number in range(500):
+                buffer.append(number)
+
+        thread = threading.Thread(target=add)
+        thread.start()
+        while len(results) < 500:
+            try:
+                results.append(buffer.popleft())
+            except IndexError:
+                continue
+        thread.join()
+
+        self.assertEqual(results, list(range(500)))
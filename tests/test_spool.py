@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from chomper import Item
+from chomper.support.spool import SpoolQueue
+
+
+class SpoolQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'spool.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_batches(self):
+        spool = SpoolQueue(self.path, 'test', batch_size=10)
+        spool.open()
+        spool.feed(Item(number=number) for number in range(25))
+
+        batches = []
+        for rows in spool:
+            items = spool.load(rows)
+            batches.append([item.number for item in items])
+            spool.ack(rows)
+
+        self.assertEqual(batches, [list(range(10)), list(range(10, 20)), list(range(20, 25))])
+        self.assertTrue(isinstance(items[0], Item))
+        self.assertEqual(spool.stats()['depth'], 0)
+        self.assertEqual(spool.stats()['drained'], 25)
+
+    def test_unacknowledged_items_are_kept(self):
+        spool = SpoolQueue(self.path, 'test', batch_size=10)
+        spool.open()
+        spool.feed(Item(number=number) for number in range(25))
+        for rows in spool:
+            spool.ack(rows)
+            break
+        spool.close()
+
+        # A new queue on the same file (e.g. after a restart) picks up where the last one stopped
+        spool = SpoolQueue(self.path, 'test', batch_size=100)
+        spool.open()
+        self.assertEqual(spool.stats()['depth'], 15)
+        spool.feed(Item(number=number) for number in range(25, 30))
+        rows = next(iter(spool))
+        self.assertEqual([item.number for item in spool.load(rows)], list(range(10, 30)))
+
+    def test_threads(self):
+        spool = SpoolQueue(self.path, 'test', batch_size=7)
+        spool.flush_interval = 0
+        spool.open()
+        items = (Item(number=number) for number in range(500))
+        thread = threading.Thread(target=spool.feed, args=(items, ))
+        thread.start()
+
+        results = []
+        for rows in spool:
+            results += [item.number for item in spool.load(rows)]
+            spool.ack(rows)
+        thread.join()
+
+        self.assertEqual(results, list(range(500)))
+
+    def test_feed_errors(self):
+        def items():
+            yield Item(number=1)
+            raise ValueError('failed')
+
+        spool = SpoolQueue(self.path, 'test')
+        spool.open()
+        spool.feed(items())
+
+        iterator = iter(spool)
+        self.assertEqual(len(next(iterator)), 1)
+        self.assertRaises(ValueError, next, iterator)
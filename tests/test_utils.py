@@ -1,7 +1,9 @@
 import unittest
+from functools import partial
 
 from chomper import Item
-from chomper.utils import type_name, path_split, path_get, path_set, path_del, path_exists
+from chomper.utils import type_name, path_split, path_get, path_set, path_del, path_exists, get_arity, invoker, \
+    smart_invoke
 
 
 class UtilsTest(unittest.TestCase):
@@ -78,3 +80,28 @@ class UtilsTest(unittest.TestCase):
         self.assertTrue(path_exists('users[1].name', item))
         self.assertFalse(path_exists('users.0', item))
         self.assertFalse(path_exists('users[2]', item))
+
+    def test_get_arity(self):
+        class Callable(object):
+            def __call__(self, item, importer):
+                pass
+
+            def method(self, item):
+                pass
+
+            @classmethod
+            def class_method(cls, item, importer, other):
+                pass
+
+        self.assertEqual(get_arity(lambda: None), 0)
+        self.assertEqual(get_arity(lambda item, importer=None: None), 2)
+        self.assertEqual(get_arity(Callable()), 2)
+        self.assertEqual(get_arity(Callable().method), 1)
+        self.assertEqual(get_arity(Callable.class_method), 3)
+        self.assertEqual(get_arity(partial(lambda item, importer: None, 1)), 1)
+
+    def test_smart_invoke(self):
+        self.assertEqual(smart_invoke(lambda item: item, [1, 2]), 1)
+        self.assertEqual(smart_invoke(lambda item, importer: (item, importer), [1, 2]), (1, 2))
+        self.assertEqual(smart_invoke(lambda item: item, 1), 1)
+        self.assertEqual(invoker(lambda: 'called')([1, 2]), 'called')